@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Adaptive per-target timeouts for Orion Sentinel DNS HA health checks
+
+Tracks a smoothed RTT and RTT variance per target, the way TCP computes its
+retransmission timeout (RFC 6298), and derives from them:
+- The timeout to use for the next probe (SRTT + 4*RTTVAR, clamped to a
+  floor and ceiling)
+- A "slow" verdict once SLOW_REQUIRED of the last SLOW_WINDOW samples fell
+  well outside the target's normal range, so one late answer does not warn
+
+A resolver that normally answers in 2 ms is then given the floor (a few
+hundred milliseconds), not 5 s, so a dead one is detected quickly, while a naturally slow target
+gets a correspondingly larger timeout and does not flap.
+
+The estimator only learns from answers, so a target whose RTT jumps well
+above its RTO would otherwise time out forever. As in TCP (Karn's
+algorithm) each consecutive timed-out run doubles the timeout, bounded at
+2**MAX_BACKOFF times the RTO, and every CEILING_PROBE_EVERY-th one probes at
+the ceiling so even a much slower target is measured and relearned. A target
+that stays dead therefore costs a bounded multiple of its RTO most runs;
+the first answer resets the backoff.
+
+Estimator state (SRTT/RTTVAR, consecutive timeouts, recent slow verdicts)
+is persisted as JSON so it survives restarts.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from typing import Dict, List
+
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+MAX_BACKOFF = 3
+CEILING_PROBE_EVERY = 4
+SLOW_WINDOW = 5
+SLOW_REQUIRED = 3
+
+
+def default_state_file() -> str:
+    """HEALTH_STATE_DIR/timeouts.json, falling back to the temp dir when /var/lib is not writable"""
+    state_dir = os.getenv("HEALTH_STATE_DIR", "")
+    if not state_dir:
+        state_dir = "/var/lib/orion-health"
+        parent = os.path.dirname(state_dir)
+        if not os.access(state_dir if os.path.isdir(state_dir) else parent, os.W_OK):
+            state_dir = os.path.join(tempfile.gettempdir(), "orion-health")
+    return os.path.join(state_dir, "timeouts.json")
+
+
+class RttEstimator:
+    """RFC 6298 style SRTT/RTTVAR estimator for one target (seconds)"""
+
+    def __init__(self, srtt: float = None, rttvar: float = None, timeouts: int = 0,
+                 recent_slow: List[bool] = None):
+        self.srtt = srtt
+        self.rttvar = rttvar
+        self.timeouts = timeouts
+        # Per-sample slow verdicts, newest last, at most SLOW_WINDOW of them
+        self.recent_slow = list(recent_slow or [])[-SLOW_WINDOW:]
+
+    def observe(self, sample: float):
+        """Fold a successful round-trip time into the estimate"""
+        self.timeouts = 0
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - sample)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * sample
+
+    def rto(self, floor: float, ceiling: float) -> float:
+        """Timeout for the next probe; the ceiling until a first sample exists"""
+        if self.srtt is None:
+            return ceiling
+        if self.timeouts and self.timeouts % CEILING_PROBE_EVERY == 0:
+            return ceiling
+        base = max(floor, self.srtt + K * self.rttvar)
+        return min(ceiling, base * 2 ** min(self.timeouts, MAX_BACKOFF))
+
+    def is_slow(self, sample: float, floor: float) -> bool:
+        """True when a sample falls outside the target's usual range"""
+        if self.srtt is None:
+            return False
+        return sample > max(floor, self.srtt + K * self.rttvar)
+
+
+class TimeoutTracker:
+    """Thread-safe collection of per-target estimators with JSON persistence"""
+
+    def __init__(self, state_file: str = ""):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._estimators: Dict[str, RttEstimator] = {}
+        if state_file:
+            self.load()
+
+    def _get(self, target: str) -> RttEstimator:
+        if target not in self._estimators:
+            self._estimators[target] = RttEstimator()
+        return self._estimators[target]
+
+    def timeout_for(self, target: str, floor: float, ceiling: float) -> float:
+        with self._lock:
+            return self._get(target).rto(floor, ceiling)
+
+    def observe(self, target: str, sample: float, floor: float, retried: bool = False) -> bool:
+        """Record a successful sample; returns True if the target is persistently slow
+
+        A sample counts as slow when it is outside the usual range or needed a
+        retry; the verdict is only True once SLOW_REQUIRED of the last
+        SLOW_WINDOW samples were slow.
+        """
+        with self._lock:
+            estimator = self._get(target)
+            slow = retried or estimator.is_slow(sample, floor)
+            estimator.observe(sample)
+            estimator.recent_slow = (estimator.recent_slow + [slow])[-SLOW_WINDOW:]
+            return slow and sum(estimator.recent_slow) >= SLOW_REQUIRED
+
+    def timed_out(self, target: str):
+        """Record a run that got no answer at all; backs off the next timeout"""
+        with self._lock:
+            self._get(target).timeouts += 1
+
+    def snapshot(self, target: str) -> Dict:
+        with self._lock:
+            estimator = self._get(target)
+            return {"srtt": estimator.srtt, "rttvar": estimator.rttvar, "timeouts": estimator.timeouts}
+
+    def load(self):
+        """Restore estimator state; a missing or corrupt file just starts fresh"""
+        try:
+            with open(self.state_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for target, state in data.items():
+                self._estimators[target] = RttEstimator(
+                    state.get("srtt"), state.get("rttvar"), int(state.get("timeouts", 0)),
+                    [bool(v) for v in state.get("recent_slow", [])]
+                )
+
+    def save(self):
+        """Atomically write estimator state so a crash never leaves a half-written file"""
+        if not self.state_file:
+            return
+        with self._lock:
+            data = {
+                target: {
+                    "srtt": e.srtt, "rttvar": e.rttvar,
+                    "timeouts": e.timeouts, "recent_slow": e.recent_slow,
+                }
+                for target, e in self._estimators.items()
+            }
+        try:
+            directory = os.path.dirname(self.state_file) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".timeouts-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            print(f"Warning: cannot persist timeout state to {self.state_file}: {e}", file=sys.stderr)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Declarative check registry for Orion Sentinel DNS HA health checks
+
+Each check is declared once with its name, severity, prerequisites, timeout
+and enable condition. The registry turns the enabled checks into CheckJobs
+for the concurrent runner, which skips dependants of failed prerequisites
+instead of letting them burn their full timeouts.
+
+Enable conditions and timeouts can be overridden without code changes:
+- HEALTH_CHECKS_DISABLED: comma-separated check names to turn off
+- HEALTH_CHECKS_CONFIG: YAML file of per-check overrides, e.g.
+
+    checks:
+      dnssec_validation:
+        enabled: true
+        timeout: 8
+      container_keepalived:
+        enabled: false
+"""
+
+import os
+import sys
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from check_runner import CheckJob, CheckResult
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+SEVERITIES = ("degraded", "unhealthy")
+
+
+class CheckSpec:
+    """Declaration of a single health check"""
+
+    def __init__(self, name: str, func: Callable[..., CheckResult], args: Tuple = (),
+                 label: str = None, severity: str = "degraded",
+                 depends_on: Sequence[str] = (), timeout: float = 5.0, enabled: bool = True):
+        if severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity for check {name}: {severity}")
+        self.name = name
+        self.func = func
+        self.args = args
+        self.label = label or name
+        self.severity = severity
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.enabled = enabled
+
+    def job(self) -> CheckJob:
+        return CheckJob(self.name, self.func, self.args, self.timeout, self.depends_on)
+
+
+class CheckRegistry:
+    """Ordered collection of CheckSpecs; declaration order is report order"""
+
+    def __init__(self):
+        self._specs: "OrderedDict[str, CheckSpec]" = OrderedDict()
+
+    def register(self, name: str, func: Callable[..., CheckResult], **kwargs) -> CheckSpec:
+        """Declare a check; see CheckSpec for the accepted keyword arguments"""
+        if name in self._specs:
+            raise ValueError(f"Check already registered: {name}")
+        spec = CheckSpec(name, func, **kwargs)
+        self._specs[name] = spec
+        return spec
+
+    def get(self, name: str) -> CheckSpec:
+        return self._specs[name]
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def enabled_specs(self, only: Iterable[str] = None) -> List[CheckSpec]:
+        """Return enabled specs in declaration order, optionally limited to some names"""
+        wanted = set(only) if only is not None else None
+        return [
+            spec for spec in self._specs.values()
+            if spec.enabled and (wanted is None or spec.name in wanted)
+        ]
+
+    def with_prerequisites(self, names: Iterable[str]) -> List[str]:
+        """Expand check names with their transitive prerequisites; raises KeyError for unknown names"""
+        wanted: List[str] = []
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in wanted:
+                continue
+            spec = self._specs[name]
+            wanted.append(name)
+            pending.extend(dep for dep in spec.depends_on if dep in self._specs)
+        return wanted
+
+    def apply_overrides(self, overrides: Dict[str, Dict]):
+        """Apply per-check `enabled` / `timeout` overrides"""
+        for name, settings in overrides.items():
+            spec = self._specs.get(name)
+            if spec is None:
+                print(f"Warning: override for unknown health check '{name}' ignored", file=sys.stderr)
+                continue
+            if "enabled" in settings:
+                spec.enabled = bool(settings["enabled"])
+            if "timeout" in settings:
+                spec.timeout = float(settings["timeout"])
+
+    def load_overrides(self):
+        """Apply overrides from HEALTH_CHECKS_CONFIG (YAML) and HEALTH_CHECKS_DISABLED"""
+        config_path = os.getenv("HEALTH_CHECKS_CONFIG", "")
+        if config_path:
+            if yaml is None:
+                print("Warning: PyYAML not available, ignoring HEALTH_CHECKS_CONFIG", file=sys.stderr)
+            else:
+                try:
+                    with open(config_path) as f:
+                        config = yaml.safe_load(f) or {}
+                    self.apply_overrides(config.get("checks") or {})
+                except (OSError, yaml.YAMLError) as e:
+                    print(f"Warning: cannot load {config_path}: {e}", file=sys.stderr)
+
+        disabled = os.getenv("HEALTH_CHECKS_DISABLED", "")
+        self.apply_overrides({
+            name.strip(): {"enabled": False} for name in disabled.split(",") if name.strip()
+        })
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Concurrent check runner for Orion Sentinel DNS HA health checks
+
+Runs independent health checks in parallel on short-lived daemon threads:
+- Per-check timeouts (a hung probe is reported as failed, not waited on)
+- A global deadline for the whole run
+- Bounded concurrency (max_workers)
+- Dependencies: a job starts only after its prerequisites pass, and is
+  reported as skipped (without spending its timeout) if any of them fail
+- Outcomes returned in the order the jobs were submitted
+
+Check functions return (success, message) or (status, message, details),
+where status is True/False or one of "pass", "warn", "fail" and details is a
+dict of structured data (e.g. latency percentiles) to include in the report.
+A "warn" result still satisfies dependants.
+
+Checks that overrun their timeout keep running in the background until their
+own socket/subprocess timeout fires, but their late results are discarded and
+they no longer occupy a worker slot.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+CheckResult = Tuple[Any, ...]
+
+
+class CheckJob:
+    """A single health check to execute"""
+
+    def __init__(self, name: str, func: Callable[..., CheckResult],
+                 args: Tuple = (), timeout: float = 5.0,
+                 depends_on: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.timeout = timeout
+        self.depends_on = tuple(depends_on)
+
+
+class CheckOutcome:
+    """Result of executing a CheckJob"""
+
+    def __init__(self, name: str, success: bool, message: str,
+                 duration: float, timed_out: bool = False, skipped: bool = False,
+                 status: str = None, details: Optional[Dict] = None):
+        self.name = name
+        self.success = success
+        self.message = message
+        self.duration = duration
+        self.timed_out = timed_out
+        self.skipped = skipped
+        self.status = status or ("pass" if success else "fail")
+        self.details = details
+
+
+class CheckRunner:
+    """Run CheckJobs concurrently with per-check timeouts and a global deadline"""
+
+    def __init__(self, max_workers: int = 8, deadline: float = 8.0):
+        self.max_workers = max(1, max_workers)
+        self.deadline = deadline
+
+    def run(self, jobs: List[CheckJob]) -> List[CheckOutcome]:
+        """Execute jobs and return their outcomes in submission order"""
+        start = time.monotonic()
+        hard_deadline = start + self.deadline
+        done: "queue.Queue[Tuple[int, str, str, Optional[Dict], float]]" = queue.Queue()
+        index = {job.name: idx for idx, job in enumerate(jobs)}
+        # Prerequisites that are not part of this run are treated as satisfied
+        deps: Dict[int, List[int]] = {
+            idx: [index[d] for d in job.depends_on if d in index]
+            for idx, job in enumerate(jobs)
+        }
+        pending = deque(range(len(jobs)))
+        # index -> (started, expiry, clipped_by_deadline)
+        running = {}
+        outcomes: List[Optional[CheckOutcome]] = [None] * len(jobs)
+
+        while pending or running:
+            now = time.monotonic()
+            progressed = True
+            while progressed:
+                progressed = False
+                for idx in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    job = jobs[idx]
+                    unmet = [d for d in deps[idx] if outcomes[d] is None]
+                    failed = [jobs[d].name for d in deps[idx]
+                              if outcomes[d] is not None and not outcomes[d].success]
+                    if failed:
+                        pending.remove(idx)
+                        outcomes[idx] = CheckOutcome(
+                            job.name, False,
+                            f"Skipped: prerequisite {', '.join(failed)} failed",
+                            0.0, skipped=True
+                        )
+                        progressed = True
+                        continue
+                    if unmet:
+                        continue
+                    pending.remove(idx)
+                    progressed = True
+                    remaining = hard_deadline - now
+                    if remaining <= 0:
+                        outcomes[idx] = CheckOutcome(
+                            job.name, False,
+                            f"Check not started: global deadline of {self.deadline:g}s exceeded",
+                            0.0, timed_out=True
+                        )
+                        continue
+                    clipped = remaining < job.timeout
+                    running[idx] = (now, now + min(job.timeout, remaining), clipped)
+                    threading.Thread(
+                        target=self._execute,
+                        args=(idx, job, done),
+                        name=f"health-check-{job.name}",
+                        daemon=True
+                    ).start()
+
+            if not running:
+                if pending:
+                    # Only reachable with a dependency cycle
+                    for idx in pending:
+                        outcomes[idx] = CheckOutcome(
+                            jobs[idx].name, False, "Skipped: circular dependency", 0.0, skipped=True
+                        )
+                    pending.clear()
+                continue
+
+            next_expiry = min(expiry for _, expiry, _ in running.values())
+            try:
+                idx, status, message, details, duration = done.get(
+                    timeout=max(0.0, next_expiry - time.monotonic())
+                )
+            except queue.Empty:
+                now = time.monotonic()
+                for idx, (started, expiry, clipped) in list(running.items()):
+                    if expiry <= now:
+                        del running[idx]
+                        if clipped:
+                            message = f"Check aborted: global deadline of {self.deadline:g}s exceeded"
+                        else:
+                            message = f"Check timed out after {jobs[idx].timeout:g}s"
+                        outcomes[idx] = CheckOutcome(
+                            jobs[idx].name, False, message, now - started, timed_out=True
+                        )
+                continue
+
+            if idx not in running:
+                # Late result from a check that already timed out
+                continue
+            del running[idx]
+            outcomes[idx] = CheckOutcome(
+                jobs[idx].name, status != "fail", message, duration, status=status, details=details
+            )
+
+        return outcomes
+
+    @staticmethod
+    def _execute(idx: int, job: CheckJob, done: "queue.Queue") -> None:
+        """Run a single job on a worker thread and report its result"""
+        started = time.monotonic()
+        details = None
+        try:
+            result = job.func(*job.args)
+            status, message = normalize_status(result[0]), result[1]
+            if len(result) > 2:
+                details = result[2]
+        except Exception as e:
+            status, message = "fail", f"Check raised {e.__class__.__name__}: {e}"
+        done.put((idx, status, message, details, time.monotonic() - started))
+
+
+def normalize_status(status) -> str:
+    """Map a check's returned status (bool or pass/warn/fail) to a status string"""
+    if status in ("pass", "warn", "fail"):
+        return status
+    return "pass" if status else "fail"
@@ -5,77 +5,229 @@ DNS Health HTTP Service
 Provides HTTP endpoint for health status checking.
 Useful for external monitoring systems, load balancers, etc.
 
+Checks run in the background every HEALTH_REFRESH_INTERVAL seconds and
+requests are answered from the last result, so pollers no longer trigger
+probes. A result older than HEALTH_CACHE_MAX_AGE is refreshed synchronously,
+and `?fresh=1` forces a refresh. Responses carry the result's age in
+`age_seconds` and the `Age` header. Refreshes are coalesced: requests that
+arrive while a run is in flight share its result instead of starting their own.
+
+Each connection is served on its own thread (up to HEALTH_MAX_CONNECTIONS),
+so /live and /ready never queue behind a slow /health/detailed, and
+HTTP/1.1 keep-alive lets scrapers reuse their connections. Event streams
+use a separate pool of HEALTH_MAX_STREAMS connections.
+
 Endpoints:
   GET /health - Returns aggregated health status
   GET /health/detailed - Returns detailed health check results
+  GET /health/check/<name> - Runs a single check (and its prerequisites) now
   GET /ready - Kubernetes-style readiness probe
   GET /live - Kubernetes-style liveness probe
+  GET /metrics - Prometheus metrics from the cached results (never probes)
+  GET /health/stream - Server-Sent Events: check status / latency bucket changes
 """
 
 import sys
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import gzip
+from http.server import BaseHTTPRequestHandler
 from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
 import os
 
 # Import the health checker module
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from health_checker import HealthChecker
+from health_monitor import BoundedThreadingHTTPServer, HealthMonitor, latency_band
+
+
+# Checks /ready depends on; on a stale cache only these (and their prerequisites) are run
+READINESS_CHECKS = ("pihole_primary", "pihole_secondary", "unbound_primary", "unbound_secondary")
 
 
 class HealthHandler(BaseHTTPRequestHandler):
     """HTTP request handler for health endpoints"""
     
+    monitor: HealthMonitor = None
+    max_age = 30.0
+    # Bodies smaller than this are not worth gzipping
+    gzip_min_size = 512
+    stream_heartbeat = 15.0
+    # Keep-alive: idle connections are closed after `timeout` seconds to free their slot
+    protocol_version = "HTTP/1.1"
+    timeout = 30
+    # Headers and body are written separately; without this Nagle delays keep-alive replies
+    disable_nagle_algorithm = True
+    
     def do_GET(self):
         """Handle GET requests"""
+        url = urlsplit(self.path)
+        self.query = parse_qs(url.query)
         
-        if self.path == "/health":
+        if url.path == "/health":
             self.handle_health_simple()
-        elif self.path == "/health/detailed":
+        elif url.path == "/health/detailed":
             self.handle_health_detailed()
-        elif self.path == "/ready":
+        elif url.path == "/health/stream":
+            self.handle_stream()
+        elif url.path.startswith("/health/check/"):
+            self.handle_single_check(url.path[len("/health/check/"):])
+        elif url.path == "/ready":
             self.handle_readiness()
-        elif self.path == "/live":
+        elif url.path == "/live":
             self.handle_liveness()
+        elif url.path == "/metrics":
+            self.handle_metrics()
         else:
             self.send_error(404, "Endpoint not found")
     
+    def get_results(self, only=None):
+        """Cached results, refreshed synchronously when stale or when ?fresh=1 is given"""
+        fresh = self.query.get("fresh", ["0"])[-1] in ("1", "true", "yes")
+        results, age, generation = self.monitor.get(self.max_age, fresh=fresh, only=only)
+        self.result_age = age
+        # Weak validator: the same cached run renders the same state (only ages differ)
+        self.etag = f'W/"{generation}"' if generation is not None else None
+        return results
+    
     def handle_health_simple(self):
         """Simple health check - just overall status"""
-        checker = HealthChecker()
-        results = checker.run_checks()
+        results = self.get_results()
         
         status_code = 200 if results["status"] == "healthy" else 503
         
         response = {
             "status": results["status"],
             "timestamp": results["timestamp"],
+            "age_seconds": round(self.result_age, 3),
             "errors_count": len(results["errors"])
         }
         
-        self.send_json_response(response, status_code)
+        self.send_json_response(response, status_code, etag=self.etag)
     
     def handle_health_detailed(self):
         """Detailed health check - all check results"""
-        checker = HealthChecker()
-        results = checker.run_checks()
+        results = self.get_results()
         
         status_code = 200 if results["status"] in ["healthy", "degraded"] else 503
         
-        self.send_json_response(results, status_code)
+        self.send_json_response(dict(results, age_seconds=round(self.result_age, 3)), status_code, etag=self.etag)
+    
+    def handle_single_check(self, name):
+        """Run one check (plus its prerequisites) on demand and report just that check"""
+        registry = self.monitor.checker.registry
+        if name not in registry.names() or not registry.get(name).enabled:
+            self.send_json_response({"error": f"Unknown or disabled check: {name}"}, 404)
+            return
+        
+        results = self.monitor.refresh(only=[name])
+        check = results["checks"][name]
+        status_code = 200 if check["status"] in ("pass", "warn") else 503
+        
+        self.send_json_response(dict(check, name=name, timestamp=results["timestamp"]), status_code)
+    
+    def handle_stream(self):
+        """Server-Sent Events: push a `check` event when a check's status or latency
+        bucket changes and a `status` event when the overall status changes
+        
+        A `snapshot` event with every check is sent first; comment heartbeats
+        keep the connection alive between changes. Never starts a run itself.
+        Streams have their own pool (HEALTH_MAX_STREAMS) and do not hold one
+        of the HEALTH_MAX_CONNECTIONS slots.
+        """
+        if not self.server.begin_stream():
+            self.close_connection = True
+            self.send_json_response({"error": "Too many open event streams"}, 503)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        # No Content-Length: the stream ends when the connection does
+        self.close_connection = True
+        
+        sent = {}
+        overall = None
+        generation = self.monitor.generation
+        result, _ = self.monitor.snapshot()
+        try:
+            if result is not None:
+                sent = self._stream_state(result, sent)
+                overall = result["status"]
+                self._send_event("snapshot", generation, {
+                    "status": overall,
+                    "timestamp": result["timestamp"],
+                    "checks": {
+                        name: self._stream_check(check, sent[name][1])
+                        for name, check in result["checks"].items()
+                    },
+                })
+            
+            while True:
+                result, new_generation = self.monitor.wait_for_update(generation, self.stream_heartbeat)
+                if result is None:
+                    self.wfile.write(b": heartbeat\n\n")
+                    self.wfile.flush()
+                    continue
+                generation = new_generation
+                
+                state = self._stream_state(result, sent)
+                for name, check in result["checks"].items():
+                    if sent.get(name) != state[name]:
+                        self._send_event("check", generation,
+                                         dict(self._stream_check(check, state[name][1]), name=name))
+                sent = state
+                if result["status"] != overall:
+                    overall = result["status"]
+                    self._send_event("status", generation, {"status": overall, "timestamp": result["timestamp"]})
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            # Client went away
+            return
+    
+    @staticmethod
+    def _stream_check(check, band):
+        return {
+            "status": check["status"],
+            "message": check["message"],
+            "duration_ms": check["duration_ms"],
+            "latency_bucket": band,
+        }
+    
+    @staticmethod
+    def _stream_state(result, previous):
+        """What a change is detected on: (status, latency band) per check
+        
+        The band comes from the latency the probe measured (`latency_ms` in
+        the check's details), not the runner's wall time, which for cheap
+        checks like the cached container listing is scheduling noise. Checks
+        that measure no latency only change on status.
+        """
+        state = {}
+        for name, check in result["checks"].items():
+            latency_ms = check.get("details", {}).get("latency_ms")
+            band = None
+            if latency_ms is not None:
+                band = latency_band(latency_ms / 1000.0, (previous.get(name) or (None, None))[1])
+            state[name] = (check["status"], band)
+        return state
+    
+    def _send_event(self, event, event_id, data):
+        self.wfile.write(f"event: {event}\nid: {event_id}\ndata: {json.dumps(data)}\n\n".encode())
+        self.wfile.flush()
     
     def handle_readiness(self):
         """Kubernetes-style readiness probe"""
-        checker = HealthChecker()
-        results = checker.run_checks()
+        registry = self.monitor.checker.registry
+        results = self.get_results(only=[name for name in READINESS_CHECKS if name in registry.names()])
         
-        # Ready if at least one Pi-hole and one Unbound are working
+        # Ready if at least one Pi-hole and one Unbound are working; a slow
+        # ("warn") target still serves, as for /health/check/<name>
         pihole_ok = any(
-            results["checks"].get(f"pihole_{role}", {}).get("status") == "pass"
+            results["checks"].get(f"pihole_{role}", {}).get("status") in ("pass", "warn")
             for role in ["primary", "secondary"]
         )
         unbound_ok = any(
-            results["checks"].get(f"unbound_{role}", {}).get("status") == "pass"
+            results["checks"].get(f"unbound_{role}", {}).get("status") in ("pass", "warn")
             for role in ["primary", "secondary"]
         )
         
@@ -84,10 +236,11 @@ class HealthHandler(BaseHTTPRequestHandler):
         
         response = {
             "ready": ready,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "age_seconds": round(self.result_age, 3)
         }
         
-        self.send_json_response(response, status_code)
+        self.send_json_response(response, status_code, etag=self.etag)
     
     def handle_liveness(self):
         """Kubernetes-style liveness probe - just check if we're alive"""
@@ -98,15 +251,68 @@ class HealthHandler(BaseHTTPRequestHandler):
         
         self.send_json_response(response, 200)
     
-    def send_json_response(self, data, status_code=200):
-        """Send JSON response"""
+    def handle_metrics(self):
+        """Prometheus text exposition of the cached results; never starts a run"""
+        body = self.monitor.render_metrics().encode()
+        self.send_body(200, "text/plain; version=0.0.4; charset=utf-8", body)
+    
+    def send_json_response(self, data, status_code=200, etag=None):
+        """Send JSON response; compact unless ?pretty=1 is given"""
+        headers = {}
+        if "age_seconds" in data:
+            headers["Age"] = str(int(data["age_seconds"]))
+        
+        if self.query.get("pretty", ["0"])[-1] in ("1", "true", "yes"):
+            body = json.dumps(data, indent=2)
+        else:
+            body = json.dumps(data, separators=(",", ":"))
+        self.send_body(status_code, "application/json", body.encode(), etag=etag, headers=headers)
+    
+    def send_body(self, status_code, content_type, body, etag=None, headers=None):
+        """Send a response, answering 304 for a matching If-None-Match and gzipping when accepted"""
+        if etag and status_code == 200 and self._etag_matches(etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+        
+        compress = len(body) >= self.gzip_min_size and self._accepts_gzip()
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+        
         self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Type", content_type)
         self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if etag:
+            self.send_header("ETag", etag)
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        
-        response_json = json.dumps(data, indent=2)
-        self.wfile.write(response_json.encode())
+        self.wfile.write(body)
+    
+    def _etag_matches(self, etag):
+        """Weak comparison against If-None-Match (RFC 9110)"""
+        header = self.headers.get("If-None-Match", "")
+        if header.strip() == "*":
+            return True
+        opaque = etag[2:] if etag.startswith("W/") else etag
+        for candidate in header.split(","):
+            candidate = candidate.strip()
+            if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+                return True
+        return False
+    
+    def _accepts_gzip(self):
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = coding.strip().partition(";")
+            if name.strip().lower() in ("gzip", "*"):
+                return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+        return False
     
     def log_message(self, format, *args):
         """Override to customize logging"""
@@ -130,24 +336,56 @@ def main():
         default="0.0.0.0",
         help="Host to bind to (default: 0.0.0.0)"
     )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=float(os.getenv("HEALTH_REFRESH_INTERVAL", "15")),
+        help="Seconds between background check runs (default: 15)"
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=float(os.getenv("HEALTH_CACHE_MAX_AGE", "30")),
+        help="Serve cached results up to this age before refreshing inline (default: 30)"
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=int(os.getenv("HEALTH_MAX_CONNECTIONS", "64")),
+        help="Concurrent connections served before new ones get 503 (default: 64)"
+    )
+    parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=int(os.getenv("HEALTH_MAX_STREAMS", "16")),
+        help="Concurrent /health/stream clients, served outside --max-connections (default: 16)"
+    )
     
     args = parser.parse_args()
     
+    HealthHandler.monitor = HealthMonitor(interval=args.interval).start()
+    HealthHandler.max_age = args.max_age
+    HealthHandler.stream_heartbeat = float(os.getenv("HEALTH_STREAM_HEARTBEAT", "15"))
+    
     server_address = (args.host, args.port)
-    httpd = HTTPServer(server_address, HealthHandler)
+    httpd = BoundedThreadingHTTPServer(server_address, HealthHandler, args.max_connections, args.max_streams)
     
     print(f"Starting DNS Health HTTP Service on {args.host}:{args.port}")
+    print(f"Checks refresh every {args.interval:g}s, cached results served up to {args.max_age:g}s old")
     print(f"Endpoints:")
     print(f"  GET http://{args.host}:{args.port}/health - Simple health status")
     print(f"  GET http://{args.host}:{args.port}/health/detailed - Detailed status")
     print(f"  GET http://{args.host}:{args.port}/ready - Readiness probe")
     print(f"  GET http://{args.host}:{args.port}/live - Liveness probe")
+    print(f"  GET http://{args.host}:{args.port}/metrics - Prometheus metrics")
+    print(f"  GET http://{args.host}:{args.port}/health/stream - Server-Sent Events")
     
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down...")
-        httpd.shutdown()
+        HealthHandler.monitor.stop()
+        httpd.server_close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Minimal DNS wire-protocol client for Orion Sentinel DNS HA health checks
+
+Replaces the dig/nslookup subprocesses used by the health checker:
+- Builds queries with random transaction IDs (optionally with EDNS0 + DO bit)
+- Sends over UDP and retries over TCP when the response is truncated
+- Parses the header (RCODE, AD/TC flags, section counts) and answer RR types
+- Measures real round-trip latency in microseconds
+"""
+
+import secrets
+import socket
+import struct
+import time
+from typing import List, Tuple
+
+QTYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "PTR": 12, "MX": 15,
+          "TXT": 16, "AAAA": 28, "DS": 43, "RRSIG": 46, "DNSKEY": 48}
+
+RCODE_NAMES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN",
+               4: "NOTIMP", 5: "REFUSED"}
+
+FLAG_QR = 0x8000
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+FLAG_AD = 0x0020
+
+EDNS_BUFFER_SIZE = 1232
+
+
+class DnsProbeError(Exception):
+    """Raised when a DNS probe gets no usable response"""
+
+
+class DnsProbeResult:
+    """Parsed outcome of a single DNS probe"""
+
+    def __init__(self, rcode: int, flags: int, answer_count: int,
+                 answer_types: List[int], latency_us: int, transport: str):
+        self.rcode = rcode
+        self.flags = flags
+        self.answer_count = answer_count
+        self.answer_types = answer_types
+        self.latency_us = latency_us
+        self.transport = transport
+
+    @property
+    def rcode_name(self) -> str:
+        return RCODE_NAMES.get(self.rcode, f"RCODE{self.rcode}")
+
+    @property
+    def authenticated(self) -> bool:
+        """AD flag: the resolver validated the answer with DNSSEC"""
+        return bool(self.flags & FLAG_AD)
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.flags & FLAG_TC)
+
+    @property
+    def latency_ms(self) -> float:
+        return self.latency_us / 1000.0
+
+    @property
+    def ok(self) -> bool:
+        """NOERROR with at least one answer record"""
+        return self.rcode == 0 and self.answer_count > 0
+
+
+def encode_name(qname: str) -> bytes:
+    """Encode a domain name as a sequence of length-prefixed labels"""
+    encoded = b""
+    for label in qname.rstrip(".").split("."):
+        if not label:
+            continue
+        raw = label.encode("idna") if not label.isascii() else label.encode()
+        if len(raw) > 63:
+            raise ValueError(f"DNS label too long: {label}")
+        encoded += bytes([len(raw)]) + raw
+    return encoded + b"\x00"
+
+
+def build_query(qname: str, qtype: str = "A", dnssec: bool = False,
+                query_id: int = None) -> Tuple[int, bytes]:
+    """Build a recursive query, returning (transaction id, wire bytes)"""
+    if query_id is None:
+        query_id = secrets.randbits(16)
+    flags = FLAG_RD | (FLAG_AD if dnssec else 0)
+    header = struct.pack("!HHHHHH", query_id, flags, 1, 0, 0, 1 if dnssec else 0)
+    question = encode_name(qname) + struct.pack("!HH", QTYPES.get(qtype, 1), 1)
+    packet = header + question
+    if dnssec:
+        # OPT pseudo-RR: root name, type 41, UDP payload size, DO bit set
+        packet += b"\x00" + struct.pack("!HHIH", 41, EDNS_BUFFER_SIZE, 0x00008000, 0)
+    return query_id, packet
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    """Return the offset just past a (possibly compressed) domain name"""
+    while True:
+        if offset >= len(data):
+            raise DnsProbeError("Malformed response: name runs past end of packet")
+        length = data[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        offset += length + 1
+
+
+def parse_response(data: bytes) -> Tuple[int, int, int, int, List[int]]:
+    """Parse a response into (id, flags, rcode, answer count, answer RR types)"""
+    if len(data) < 12:
+        raise DnsProbeError("Malformed response: short header")
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack("!HHHHHH", data[:12])
+    if not flags & FLAG_QR:
+        raise DnsProbeError("Malformed response: QR bit not set")
+
+    answer_types = []
+    try:
+        offset = 12
+        for _ in range(qdcount):
+            offset = _skip_name(data, offset) + 4
+        for _ in range(ancount):
+            offset = _skip_name(data, offset)
+            rtype, _, _, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+            answer_types.append(rtype)
+            offset += 10 + rdlength
+    except (struct.error, DnsProbeError):
+        # Truncated UDP answers legitimately stop mid-section
+        if not flags & FLAG_TC:
+            raise DnsProbeError("Malformed response: answer section")
+
+    return query_id, flags, flags & 0x000F, ancount, answer_types
+
+
+def _query_udp(packet: bytes, query_id: int, addr: Tuple[str, int], timeout: float) -> bytes:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(addr)
+        sock.send(packet)
+        deadline = time.monotonic() + timeout
+        while True:
+            data = sock.recv(65535)
+            if len(data) >= 2 and struct.unpack("!H", data[:2])[0] == query_id:
+                return data
+            # Stray or stale datagram: keep waiting for ours
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("timed out")
+            sock.settimeout(remaining)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = b""
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise DnsProbeError("Connection closed mid-response")
+        buf += chunk
+    return buf
+
+
+def _query_tcp(packet: bytes, addr: Tuple[str, int], timeout: float) -> bytes:
+    with socket.create_connection(addr, timeout=timeout) as sock:
+        sock.sendall(struct.pack("!H", len(packet)) + packet)
+        length = struct.unpack("!H", _recv_exact(sock, 2))[0]
+        return _recv_exact(sock, length)
+
+
+def query(server: str, qname: str, qtype: str = "A", port: int = 53,
+          timeout: float = 3.0, dnssec: bool = False, tcp: bool = False) -> DnsProbeResult:
+    """Send a single query and return the parsed result with measured latency
+
+    Raises socket.timeout when no answer arrives within timeout, OSError on
+    network errors and DnsProbeError on malformed or mismatched responses.
+    """
+    query_id, packet = build_query(qname, qtype, dnssec)
+    addr = (server, port)
+    transport = "tcp" if tcp else "udp"
+
+    start = time.perf_counter_ns()
+    if tcp:
+        data = _query_tcp(packet, addr, timeout)
+    else:
+        data = _query_udp(packet, query_id, addr, timeout)
+        if len(data) >= 4 and struct.unpack("!H", data[2:4])[0] & FLAG_TC:
+            remaining = max(0.1, timeout - (time.perf_counter_ns() - start) / 1e9)
+            data = _query_tcp(packet, addr, remaining)
+            transport = "tcp"
+    latency_us = (time.perf_counter_ns() - start) // 1000
+
+    response_id, flags, rcode, ancount, answer_types = parse_response(data)
+    if response_id != query_id:
+        raise DnsProbeError(f"Transaction ID mismatch ({response_id} != {query_id})")
+
+    return DnsProbeResult(rcode, flags, ancount, answer_types, latency_us, transport)
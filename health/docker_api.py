@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Docker Engine API client for Orion Sentinel DNS HA health checks
+
+Talks HTTP directly to the Docker daemon over its Unix socket instead of
+spawning `docker ps` / `docker inspect` for every container:
+- One `GET /containers/json?all=1` call covers every monitored container
+- State and health status are returned together
+- A short-lived cache lets concurrent checks share a single listing
+"""
+
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+# Health status embedded in the listing's Status text, e.g. "Up 2 hours (healthy)"
+_HEALTH_RE = re.compile(r"\((?:health: )?(healthy|unhealthy|starting)\)")
+
+
+class DockerAPIError(Exception):
+    """Raised when the Docker Engine API cannot be queried"""
+
+
+class ContainerStatus:
+    """State and health of a single container"""
+
+    def __init__(self, name: str, state: str, health: str, status: str):
+        self.name = name
+        self.state = state
+        self.health = health
+        self.status = status
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects to a Unix domain socket"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def default_socket_path() -> str:
+    """Resolve the daemon socket from DOCKER_HOST (unix:// only) or the default path"""
+    docker_host = os.getenv("DOCKER_HOST", "")
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://"):]
+    return DEFAULT_SOCKET
+
+
+class DockerClient:
+    """Minimal Docker Engine API client with a shared container listing cache"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 3.0,
+                 cache_ttl: float = 2.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict[str, ContainerStatus]] = None
+        self._cache_error: Optional[DockerAPIError] = None
+        self._cache_time = 0.0
+
+    def _get(self, path: str):
+        """Perform a GET request against the API and decode the JSON body"""
+        conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise DockerAPIError(f"Docker API unavailable at {self.socket_path}: {e}")
+        finally:
+            conn.close()
+
+        if response.status != 200:
+            raise DockerAPIError(f"Docker API returned status {response.status} for {path}")
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise DockerAPIError(f"Docker API returned invalid JSON for {path}")
+
+    def list_containers(self) -> Dict[str, ContainerStatus]:
+        """Return status of all containers keyed by name, served from cache when fresh
+
+        Concurrent callers block on the same listing rather than each
+        issuing their own request. Failures are cached for the same TTL so a
+        dead daemon costs one timeout per run, not one per container.
+        """
+        with self._lock:
+            if time.monotonic() - self._cache_time < self.cache_ttl:
+                if self._cache_error is not None:
+                    raise self._cache_error
+                if self._cache is not None:
+                    return self._cache
+
+            try:
+                listing = self._get("/containers/json?all=1")
+            except DockerAPIError as e:
+                self._cache, self._cache_error = None, e
+                self._cache_time = time.monotonic()
+                raise
+
+            containers = {}
+            for entry in listing:
+                status = entry.get("Status", "")
+                # Newer API versions expose health directly; older ones only in Status text
+                health = (entry.get("Health") or {}).get("Status", "")
+                if health == "none":
+                    health = ""
+                elif not health:
+                    match = _HEALTH_RE.search(status)
+                    health = match.group(1) if match else ""
+                for name in entry.get("Names", []):
+                    name = name.lstrip("/")
+                    containers[name] = ContainerStatus(name, entry.get("State", ""), health, status)
+
+            self._cache, self._cache_error = containers, None
+            self._cache_time = time.monotonic()
+            return containers
+
+    def get_container(self, name: str) -> Optional[ContainerStatus]:
+        """Return status for a single container, or None if it does not exist"""
+        return self.list_containers().get(name)
@@ -9,16 +9,23 @@ This script performs comprehensive health checks on:
 - Docker container health
 - System resources
 
+Independent checks run concurrently (see check_runner.py) with per-check
+timeouts and a global deadline, so one dead node cannot stall the whole run.
+
 Returns JSON summary and appropriate exit codes for Docker healthchecks.
+With --daemon it instead runs on a schedule and serves Prometheus metrics
+(see health_monitor.py).
 """
 
 import sys
 import json
 import subprocess
 import socket
+import ssl
+import threading
 import time
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import os
 
 try:
@@ -27,6 +34,19 @@ except ImportError:
     print("Warning: requests module not available, skipping HTTP checks", file=sys.stderr)
     requests = None
 
+import dns_probe
+import encrypted_dns_probe
+import latency_probe
+import netlink
+from adaptive_timeout import TimeoutTracker, default_state_file
+from check_registry import CheckRegistry
+from check_runner import CheckRunner
+from docker_api import DockerAPIError, DockerClient
+from pihole_client import PiholeAPIError, PiholeClient, pooled_session
+
+# Ordering of overall statuses, used so a later check never downgrades the result
+STATUS_SEVERITY = {"healthy": 0, "degraded": 1, "unhealthy": 2}
+
 
 class HealthChecker:
     """Comprehensive health checker for DNS HA stack"""
@@ -47,34 +67,163 @@ class HealthChecker:
         self.unbound_primary_ip = os.getenv("UNBOUND_PRIMARY_IP", "192.168.8.253")
         self.unbound_secondary_ip = os.getenv("UNBOUND_SECONDARY_IP", "192.168.8.254")
         self.vip = os.getenv("VIP_ADDRESS", "192.168.8.255")
+        # Interface the VIP must be on (empty = any) and netlink event subscription
+        self.vip_interface = os.getenv("NETWORK_INTERFACE", "")
+        self.vip_watch = os.getenv("VIP_WATCH", "0") == "1"
+        self._vip_watcher = None
+        # Called (from the watcher thread) when the VIP moves, e.g. by HealthMonitor
+        self.vip_change_callback: Optional[Callable[[], None]] = None
         self.pihole_password = os.getenv("PIHOLE_PASSWORD", "")
+        # Keep-alive HTTP sessions and Pi-hole API clients, reused across runs
+        self._http_lock = threading.Lock()
+        self._http_sessions = {}
+        self._pihole_clients = {}
         # Smart prefetch / extended Unbound configuration
         self.unbound_smart_prefetch = os.getenv("UNBOUND_SMART_PREFETCH", "0") == "1"
         # DoH/DoT Gateway configuration
         self.doh_dot_enabled = os.getenv("ORION_DOH_DOT_GATEWAY_ENABLED", "0") == "1"
         self.gateway_host = os.getenv("DNS_GATEWAY_HOST", "localhost")
+        self.gateway_dot_port = int(os.getenv("DNS_GATEWAY_DOT_PORT", "853"))
+        self.gateway_doh_port = int(os.getenv("DNS_GATEWAY_DOH_PORT", "443"))
+        self.gateway_doh_path = os.getenv("DNS_GATEWAY_DOH_PATH", "/dns-query")
+        self.gateway_doh_method = os.getenv("DNS_GATEWAY_DOH_METHOD", "POST")
+        self.gateway_tls_verify = os.getenv("DNS_GATEWAY_TLS_VERIFY", "0") == "1"
+        self.gateway_tls_server_name = os.getenv("DNS_GATEWAY_TLS_SERVER_NAME", "")
+        self.gateway_ca_file = os.getenv("DNS_GATEWAY_CA_FILE", "")
+        self._gateway_tls = {}
+        # Containers to monitor (comma-separated) and the Docker Engine API client
+        self.containers = [
+            c.strip() for c in os.getenv(
+                "HEALTH_CONTAINERS",
+                "pihole_primary,pihole_secondary,unbound_primary,unbound_secondary,keepalived"
+            ).split(",") if c.strip()
+        ]
+        self.docker = DockerClient(cache_ttl=float(os.getenv("DOCKER_API_CACHE_TTL", "2")))
+        # Concurrent execution: worker pool size and global deadline (seconds)
+        self.max_workers = int(os.getenv("HEALTH_MAX_WORKERS", "8"))
+        self.deadline = float(os.getenv("HEALTH_DEADLINE", "8"))
+        # Multi-sample latency probing and its SLO thresholds
+        self.latency_probe = os.getenv("HEALTH_LATENCY_PROBE", "0") == "1"
+        self.latency_samples = int(os.getenv("HEALTH_LATENCY_SAMPLES", "20"))
+        self.latency_mode = os.getenv("HEALTH_LATENCY_MODE", "burst")
+        self.latency_window = float(os.getenv("HEALTH_LATENCY_WINDOW", "1"))
+        self.latency_qname = os.getenv("HEALTH_LATENCY_QNAME", "google.com")
+        self.latency_warn_p95_ms = float(os.getenv("HEALTH_LATENCY_WARN_P95_MS", "50"))
+        self.latency_fail_p95_ms = float(os.getenv("HEALTH_LATENCY_FAIL_P95_MS", "250"))
+        self.latency_warn_loss_pct = float(os.getenv("HEALTH_LATENCY_WARN_LOSS_PCT", "5"))
+        self.latency_fail_loss_pct = float(os.getenv("HEALTH_LATENCY_FAIL_LOSS_PCT", "50"))
+        # Cache-hit vs recursion probing
+        self.recursion_probe = os.getenv("HEALTH_RECURSION_PROBE", "0") == "1"
+        self.cache_corpus = [
+            name.strip() for name in os.getenv(
+                "HEALTH_CACHE_CORPUS",
+                "google.com,cloudflare.com,wikipedia.org,github.com,amazon.com,microsoft.com,apple.com,youtube.com"
+            ).split(",") if name.strip()
+        ]
+        self.recursion_zone = os.getenv("HEALTH_RECURSION_ZONE", "")
+        self.recursion_samples = int(os.getenv("HEALTH_RECURSION_SAMPLES", "5"))
+        self.recursion_warn_p95_ms = float(os.getenv("HEALTH_RECURSION_WARN_P95_MS", "500"))
+        self.recursion_fail_p95_ms = float(os.getenv("HEALTH_RECURSION_FAIL_P95_MS", "2000"))
+        # Adaptive per-target timeouts (RTO-style), persisted between runs. The
+        # floors stay in the hundreds of ms: a probe name that misses the cache
+        # needs recursion, which serve-expired-client-timeout caps at 180 ms
+        # only where serve-expired is enabled (not in stacks/dns/unbound1 and
+        # unbound2). Raise them where cold misses are slower than that
+        self.dns_timeout_floor = float(os.getenv("HEALTH_TIMEOUT_FLOOR", "0.3"))
+        self.http_timeout_floor = float(os.getenv("HEALTH_HTTP_TIMEOUT_FLOOR", "0.5"))
+        self.timeouts = None
+        if os.getenv("HEALTH_ADAPTIVE_TIMEOUTS", "1") == "1":
+            self.timeouts = TimeoutTracker(default_state_file())
+        self.registry = self._build_registry()
+    
+    def _http_session(self, base_url: str):
+        """Return the pooled keep-alive session for a target, creating it on first use"""
+        with self._http_lock:
+            if base_url not in self._http_sessions:
+                self._http_sessions[base_url] = pooled_session()
+            return self._http_sessions[base_url]
+    
+    def _pihole_client(self, ip: str) -> PiholeClient:
+        """Return the cached Pi-hole API client (and its SID) for a target"""
+        with self._http_lock:
+            if ip not in self._pihole_clients:
+                self._pihole_clients[ip] = PiholeClient(f"http://{ip}", self.pihole_password, timeout=5)
+            return self._pihole_clients[ip]
+    
+    def _with_adaptive_timeout(self, key: str, floor: float, ceiling: float,
+                               timeout_exc, attempt_fn):
+        """Run attempt_fn(timeout) with the target's adaptive timeout
+        
+        attempt_fn returns (result, round-trip seconds). The first attempt uses
+        the learned RTO (backed off after timed-out runs); on timeout one retry
+        is made with double that (never above the ceiling). A run that gets no
+        answer is recorded so the next one backs off. Returns (result,
+        round-trip seconds, slow verdict); slow means most recent samples
+        were, not just this one.
+        """
+        if self.timeouts is None:
+            result, rtt = attempt_fn(ceiling)
+            return result, rtt, False
+        
+        timeout = self.timeouts.timeout_for(key, floor, ceiling)
+        retried = False
+        while True:
+            try:
+                result, rtt = attempt_fn(timeout)
+            except timeout_exc:
+                if retried or timeout >= ceiling:
+                    self.timeouts.timed_out(key)
+                    raise
+                retried = True
+                timeout = min(ceiling, timeout * 2)
+                continue
+            slow = self.timeouts.observe(key, rtt, floor, retried)
+            return result, rtt, slow
+    
+    def _timed_dns_query(self, ip: str, qname: str, port: int = 53, ceiling: float = 3.0,
+                         dnssec: bool = False):
+        """DNS query with an adaptive timeout; returns (result, slow verdict)"""
+        def attempt(timeout: float):
+            result = dns_probe.query(ip, qname, port=port, timeout=timeout, dnssec=dnssec)
+            return result, result.latency_us / 1e6
+        
+        result, _, slow = self._with_adaptive_timeout(
+            f"dns:{ip}:{port}", self.dns_timeout_floor, ceiling, socket.timeout, attempt
+        )
+        return result, slow
+    
+    def _usual(self, key: str) -> str:
+        """Describe a target's normal latency for slow-response messages"""
+        state = self.timeouts.snapshot(key) if self.timeouts else {}
+        if not state.get("srtt"):
+            return "no baseline yet"
+        return f"usually ~{state['srtt'] * 1000:.1f} ms"
     
     def check_pihole_api(self, ip: str, name: str) -> Tuple[bool, str]:
         """Check Pi-hole API responsiveness"""
         if not requests:
             return True, "HTTP checks disabled (requests module not available)"
         
+        client = self._pihole_client(ip)
+        key = f"pihole_api:{ip}"
+        
+        def attempt(timeout: float):
+            client.timeout = timeout
+            return client.get_summary(), client.last_request_seconds
+        
         try:
-            # Check basic API endpoint
-            url = f"http://{ip}/admin/api.php"
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Verify we got valid data
-                if "domains_being_blocked" in data:
-                    blocked = data.get("domains_being_blocked", 0)
-                    queries = data.get("dns_queries_today", 0)
-                    return True, f"API OK (blocking {blocked} domains, {queries} queries today)"
-                else:
-                    return False, "API returned invalid data"
-            else:
-                return False, f"API returned status {response.status_code}"
+            summary, elapsed, slow = self._with_adaptive_timeout(
+                key, self.http_timeout_floor, 5.0, requests.exceptions.Timeout, attempt
+            )
+            blocked = summary["domains_being_blocked"]
+            queries = summary["dns_queries_today"]
+            message = f"API OK ({summary['api']}, blocking {blocked} domains, {queries} queries today)"
+            details = {"latency_ms": round(elapsed * 1000, 2)}
+            if slow:
+                return "warn", f"{message}, slow response ({elapsed * 1000:.0f} ms, {self._usual(key)})", details
+            return True, message, details
+        except PiholeAPIError as e:
+            return False, str(e)
         except requests.exceptions.Timeout:
             return False, "API request timed out"
         except requests.exceptions.ConnectionError:
@@ -83,131 +232,180 @@ class HealthChecker:
             return False, f"API check failed: {str(e)}"
     
     def check_unbound_dns(self, ip: str, name: str) -> Tuple[bool, str]:
-        """Check Unbound DNS resolver using dig"""
+        """Check Unbound DNS resolver with a native DNS query"""
         try:
-            # Use dig to query a test domain
-            result = subprocess.run(
-                ["dig", "@" + ip, "google.com", "+short", "+time=3"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
+            result, slow = self._timed_dns_query(ip, "google.com")
             
-            if result.returncode == 0 and result.stdout.strip():
-                response_time = "< 3s"
-                return True, f"DNS resolution OK (response: {response_time})"
+            details = {"latency_ms": round(result.latency_ms, 2)}
+            if result.ok and slow:
+                return "warn", (f"DNS resolution slow (response: {result.latency_ms:.2f} ms, "
+                                f"{self._usual(f'dns:{ip}:53')})"), details
+            elif result.ok:
+                return True, f"DNS resolution OK (response: {result.latency_ms:.2f} ms)", details
+            elif result.rcode != 0:
+                return False, f"DNS query failed ({result.rcode_name})"
             else:
-                return False, "DNS query failed or no response"
-        except subprocess.TimeoutExpired:
+                return False, "DNS query returned no answer"
+        except socket.timeout:
             return False, "DNS query timed out"
-        except FileNotFoundError:
-            # dig not available, try nslookup
-            return self._check_dns_nslookup(ip, name)
+        except dns_probe.DnsProbeError as e:
+            return False, f"DNS query failed: {str(e)}"
         except Exception as e:
             return False, f"DNS check failed: {str(e)}"
     
     def check_dnssec_validation(self, ip: str, port: str = "5335") -> Tuple[bool, str]:
-        """Check DNSSEC validation is working using dig with +dnssec"""
+        """Check DNSSEC validation is working with a DO-bit query"""
         try:
-            # Query a known DNSSEC-signed domain with DNSSEC flag
-            # Use full output (not +short) to check for RRSIG and AD flag
-            result = subprocess.run(
-                ["dig", f"@{ip}", "-p", port, "cloudflare.com", "+dnssec", "+time=5"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            # Query a known DNSSEC-signed domain and check for RRSIG and AD flag
+            result, _ = self._timed_dns_query(ip, "cloudflare.com", port=int(port), ceiling=5, dnssec=True)
             
-            if result.returncode == 0:
-                output = result.stdout
-                # Check for RRSIG in the output (indicates DNSSEC signatures present)
-                if "RRSIG" in output:
-                    return True, "DNSSEC validation working (RRSIG signatures present)"
-                # Check for AD (Authenticated Data) flag in the response
-                elif "flags:" in output and "ad" in output.lower():
-                    return True, "DNSSEC validation working (AD flag set)"
-                # If we got a valid response but no DNSSEC indicators, it's still working
-                elif "ANSWER SECTION" in output:
-                    return True, "DNS resolution OK (DNSSEC query completed)"
-                else:
-                    return False, "DNSSEC query returned no answer"
+            if result.rcode != 0:
+                return False, f"DNSSEC query failed ({result.rcode_name})"
+            # AD (Authenticated Data) flag means the resolver validated the answer
+            if result.authenticated:
+                return (True, f"DNSSEC validation working (AD flag set, {result.latency_ms:.2f} ms)",
+                        {"latency_ms": round(result.latency_ms, 2)})
+            # RRSIG records present (signatures returned but not marked validated)
+            elif dns_probe.QTYPES["RRSIG"] in result.answer_types:
+                return True, "DNSSEC validation working (RRSIG signatures present)"
+            # If we got a valid response but no DNSSEC indicators, it's still working
+            elif result.answer_count > 0:
+                return True, "DNS resolution OK (DNSSEC query completed)"
             else:
-                return False, "DNSSEC query failed or no response"
-        except subprocess.TimeoutExpired:
+                return False, "DNSSEC query returned no answer"
+        except socket.timeout:
             return False, "DNSSEC query timed out"
-        except FileNotFoundError:
-            # dig not available, skip DNSSEC check
-            return True, "DNSSEC check skipped (dig not available)"
+        except dns_probe.DnsProbeError as e:
+            return False, f"DNSSEC query failed: {str(e)}"
         except Exception as e:
             return False, f"DNSSEC check failed: {str(e)}"
     
-    def _check_dns_nslookup(self, ip: str, name: str) -> Tuple[bool, str]:
-        """Fallback DNS check using nslookup"""
-        try:
-            result = subprocess.run(
-                ["nslookup", "google.com", ip],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode == 0 and "Address:" in result.stdout:
-                return True, "DNS resolution OK (via nslookup)"
-            else:
-                return False, "DNS query failed"
-        except Exception as e:
-            return False, f"DNS check failed: {str(e)}"
+    def _grade_latency(self, stats: Dict, warn_p95_ms: float, fail_p95_ms: float) -> Tuple[str, str]:
+        """Grade a latency summary against p95 and loss thresholds, returning (status, summary)"""
+        p95 = stats.get("p95_ms")
+        if p95 is None:
+            return "fail", "no answers"
+        summary = (f"p50 {stats['p50_ms']:.1f} ms, p95 {p95:.1f} ms, p99 {stats['p99_ms']:.1f} ms, "
+                   f"loss {stats['loss_pct']:g}%")
+        if stats["loss_pct"] >= self.latency_fail_loss_pct or p95 >= fail_p95_ms:
+            return "fail", summary
+        if stats["loss_pct"] >= self.latency_warn_loss_pct or p95 >= warn_p95_ms:
+            return "warn", summary
+        return "pass", summary
+    
+    def check_resolver_latency(self, ip: str, port: int = 53) -> Tuple[str, str, Dict]:
+        """Sample a resolver repeatedly and grade its tail latency and loss against the SLO"""
+        stats = latency_probe.sample_latency(
+            ip, self.latency_qname, port=port, samples=self.latency_samples,
+            mode=self.latency_mode, window=self.latency_window, timeout=3
+        )
+        status, summary = self._grade_latency(stats, self.latency_warn_p95_ms, self.latency_fail_p95_ms)
+        stats["latency_ms"] = stats.get("p95_ms")
+        
+        if status == "fail":
+            return "fail", f"Latency SLO breached ({summary})", stats
+        if status == "warn":
+            return "warn", f"Latency degraded ({summary})", stats
+        return "pass", f"Latency OK ({summary})", stats
+    
+    def check_recursion_path(self, ip: str, port: int = 53) -> Tuple[str, str, Dict]:
+        """Compare cache-hit latency on a warmed corpus with full recursion on random names"""
+        stats = latency_probe.probe_cache_and_recursion(
+            ip, self.cache_corpus, zone=self.recursion_zone,
+            recursion_samples=self.recursion_samples, port=port, timeout=3
+        )
+        cached_status, cached_summary = self._grade_latency(
+            stats["cached"], self.latency_warn_p95_ms, self.latency_fail_p95_ms
+        )
+        if "recursive" not in stats:
+            message = f"cached: {cached_summary}; recursion not probed (HEALTH_RECURSION_ZONE not set)"
+            return cached_status, message, stats
+        
+        recursive_status, recursive_summary = self._grade_latency(
+            stats["recursive"], self.recursion_warn_p95_ms, self.recursion_fail_p95_ms
+        )
+        status = max(cached_status, recursive_status, key=["pass", "warn", "fail"].index)
+        message = f"cached: {cached_summary}; recursive: {recursive_summary}"
+        if recursive_status != "pass" and cached_status == "pass":
+            message = f"Recursion path degraded while cache is healthy ({message})"
+        return status, message, stats
+    
+    def _find_vip_with_ip_command(self) -> Optional[str]:
+        """Fallback for hosts without AF_NETLINK: exact match against `ip -o addr`"""
+        result = subprocess.run(
+            ["ip", "-o", "addr", "show"],
+            capture_output=True,
+            text=True,
+            timeout=3
+        )
+        if result.returncode != 0:
+            raise RuntimeError("Failed to check VIP status")
+        for line in result.stdout.splitlines():
+            fields = line.split()
+            # "<index>: <ifname> inet <addr>/<prefix> ..."
+            if len(fields) >= 4 and fields[3].split("/")[0] == self.vip:
+                ifname = fields[1].split("@")[0]
+                if not self.vip_interface or ifname == self.vip_interface:
+                    return ifname
+        return None
+    
+    def _start_vip_watcher(self):
+        """Start the netlink VIP watcher once, if subscription mode is enabled"""
+        if self.vip_watch and self._vip_watcher is None and netlink.is_supported():
+            try:
+                self._vip_watcher = netlink.AddressWatcher(
+                    self.vip, self.vip_interface or None, on_change=self._on_vip_change
+                ).start()
+            except OSError as e:
+                print(f"Warning: VIP watcher unavailable, polling instead: {e}", file=sys.stderr)
+                self.vip_watch = False
+    
+    def _on_vip_change(self, event):
+        """Log VIP moves as soon as the kernel reports them and notify the callback"""
+        verb = "acquired on" if event.action == "add" else "released from"
+        print(f"[{datetime.now().isoformat()}] VIP {self.vip} {verb} {event.address.ifname}",
+              file=sys.stderr)
+        if self.vip_change_callback is not None:
+            self.vip_change_callback()
     
     def check_vip_status(self) -> Tuple[bool, str]:
         """Check Keepalived VIP status on this node"""
         try:
-            # Check if VIP is assigned to any interface
-            result = subprocess.run(
-                ["ip", "addr", "show"],
-                capture_output=True,
-                text=True,
-                timeout=3
-            )
+            self._start_vip_watcher()
+            if self._vip_watcher is not None and self._vip_watcher.running:
+                owner = self._vip_watcher.owner()
+                ifname = owner.ifname if owner else None
+            elif netlink.is_supported():
+                owner = netlink.find_address(self.vip, self.vip_interface or None)
+                ifname = owner.ifname if owner else None
+            else:
+                ifname = self._find_vip_with_ip_command()
             
-            if result.returncode == 0:
-                if self.vip in result.stdout:
-                    return True, f"VIP {self.vip} is ACTIVE on this node (MASTER)"
-                else:
-                    return True, f"VIP {self.vip} is on backup node (BACKUP role - normal)"
+            if ifname:
+                return True, f"VIP {self.vip} is ACTIVE on this node (MASTER, {ifname})"
             else:
-                return False, "Failed to check VIP status"
+                return True, f"VIP {self.vip} is on backup node (BACKUP role - normal)"
         except Exception as e:
             return False, f"VIP check failed: {str(e)}"
     
     def check_docker_container(self, container_name: str) -> Tuple[bool, str]:
-        """Check if Docker container is running and healthy"""
+        """Check if Docker container is running and healthy via the Engine API"""
         try:
-            # Check if container is running
-            result = subprocess.run(
-                ["docker", "ps", "--filter", f"name={container_name}", "--format", "{{.Names}}"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
+            container = self.docker.get_container(container_name)
             
-            if result.returncode == 0 and container_name in result.stdout:
-                # Check health status if available
-                health_result = subprocess.run(
-                    ["docker", "inspect", "--format", "{{.State.Health.Status}}", container_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=3
-                )
-                
-                health_status = health_result.stdout.strip()
-                if health_status == "healthy":
-                    return True, "Container running and healthy"
-                elif health_status == "":
-                    return True, "Container running (no healthcheck defined)"
-                else:
-                    return False, f"Container unhealthy: {health_status}"
+            if container is None:
+                return False, "Container not found"
+            if not container.running:
+                return False, f"Container not running (state: {container.state or 'unknown'})"
+            
+            if container.health == "healthy":
+                return True, "Container running and healthy"
+            elif container.health == "":
+                return True, "Container running (no healthcheck defined)"
             else:
-                return False, "Container not running"
+                return False, f"Container unhealthy: {container.health}"
+        except DockerAPIError as e:
+            return False, str(e)
         except Exception as e:
             return False, f"Container check failed: {str(e)}"
     
@@ -218,8 +416,8 @@ class HealthChecker:
         
         try:
             # Check Blocky API status endpoint
-            url = f"http://{self.gateway_host}:4000/api/blocking/status"
-            response = requests.get(url, timeout=5)
+            base_url = f"http://{self.gateway_host}:4000"
+            response = self._http_session(base_url).get(f"{base_url}/api/blocking/status", timeout=5)
             
             if response.status_code == 200:
                 return True, "DoH gateway API responding"
@@ -232,131 +430,216 @@ class HealthChecker:
         except Exception as e:
             return False, f"DoH gateway check failed: {str(e)}"
     
-    def check_dot_connectivity(self) -> Tuple[bool, str]:
-        """Check DoT (port 853) connectivity"""
+    def _gateway_tls_context(self, alpn: Tuple[str, ...]):
+        """TLS context for gateway probes; kept per ALPN so sessions can be resumed across runs"""
+        with self._http_lock:
+            if alpn not in self._gateway_tls:
+                self._gateway_tls[alpn] = encrypted_dns_probe.tls_context(
+                    verify=self.gateway_tls_verify, cafile=self.gateway_ca_file or None, alpn=alpn
+                )
+            return self._gateway_tls[alpn]
+    
+    @staticmethod
+    def _encrypted_probe_message(protocol: str, stats: Dict) -> str:
+        resumed = "resumed" if stats["session_resumed"] else "NOT resumed"
+        return (f"{protocol} query OK ({stats['rcode']}; handshake {stats['handshake_ms']:.1f} ms, "
+                f"{resumed} {stats['resumed_handshake_ms']:.1f} ms, "
+                f"query {stats['first_query_ms']:.1f} ms, reused {stats['reused_connection_query_ms']:.1f} ms)")
+    
+    def check_dot_connectivity(self) -> Tuple[str, str, Dict]:
+        """Send real DNS queries over DoT (port 853) and time TLS handshakes and resumption"""
         try:
-            # Attempt TCP connection to DoT port
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((self.gateway_host, 853))
-            sock.close()
-            
-            if result == 0:
-                return True, "DoT port 853 is reachable"
-            else:
-                return False, f"DoT port 853 connection failed (error: {result})"
+            stats = encrypted_dns_probe.probe_dot(
+                self.gateway_host, self.gateway_dot_port, timeout=5,
+                ctx=self._gateway_tls_context(("dot",)), server_name=self.gateway_tls_server_name or None
+            )
+            if stats["rcode"] not in ("NOERROR", "NXDOMAIN"):
+                return "fail", f"DoT query failed ({stats['rcode']})", stats
+            return "pass", self._encrypted_probe_message("DoT", stats), stats
         except socket.timeout:
             return False, "DoT connection timed out"
+        except ssl.SSLError as e:
+            return False, f"DoT TLS handshake failed: {e.reason or e}"
         except Exception as e:
             return False, f"DoT check failed: {str(e)}"
     
-    def run_checks(self) -> Dict:
-        """Run all health checks and return results"""
+    def check_doh_query(self) -> Tuple[str, str, Dict]:
+        """Send real RFC 8484 DNS queries over DoH and time TLS handshakes and resumption"""
+        try:
+            stats = encrypted_dns_probe.probe_doh(
+                self.gateway_host, self.gateway_doh_port, path=self.gateway_doh_path,
+                method=self.gateway_doh_method, timeout=5,
+                ctx=self._gateway_tls_context(("http/1.1",)),
+                server_name=self.gateway_tls_server_name or None
+            )
+            if stats["rcode"] not in ("NOERROR", "NXDOMAIN"):
+                return "fail", f"DoH query failed ({stats['rcode']})", stats
+            return "pass", self._encrypted_probe_message("DoH", stats), stats
+        except socket.timeout:
+            return False, "DoH request timed out"
+        except ssl.SSLError as e:
+            return False, f"DoH TLS handshake failed: {e.reason or e}"
+        except Exception as e:
+            return False, f"DoH check failed: {str(e)}"
+    
+    def _build_registry(self) -> CheckRegistry:
+        """Declare every check with its severity, prerequisites and timeout"""
+        registry = CheckRegistry()
         
-        # Check Pi-hole instances
-        success, message = self.check_pihole_api(self.pihole_primary_ip, "Primary")
-        self.results["checks"]["pihole_primary"] = {
-            "status": "pass" if success else "fail",
-            "message": message
-        }
-        if not success:
-            self.results["status"] = "degraded"
-            self.results["errors"].append(f"Pi-hole Primary: {message}")
+        # Only gate API/DNS checks on containers when the Docker API is reachable;
+        # an unknown container state must not hide the service's own result
+        docker_available = os.path.exists(self.docker.socket_path)
         
-        success, message = self.check_pihole_api(self.pihole_secondary_ip, "Secondary")
-        self.results["checks"]["pihole_secondary"] = {
-            "status": "pass" if success else "fail",
-            "message": message
-        }
-        if not success:
-            self.results["status"] = "degraded"
-            self.results["errors"].append(f"Pi-hole Secondary: {message}")
+        def container_dep(container: str) -> Tuple[str, ...]:
+            if docker_available and container in self.containers:
+                return (f"container_{container}",)
+            return ()
         
-        # Check Unbound instances
-        success, message = self.check_unbound_dns(self.unbound_primary_ip, "Primary")
-        self.results["checks"]["unbound_primary"] = {
-            "status": "pass" if success else "fail",
-            "message": message
-        }
-        if not success:
-            self.results["status"] = "degraded"
-            self.results["errors"].append(f"Unbound Primary: {message}")
+        # Check Pi-hole instances
+        for role, ip in (("primary", self.pihole_primary_ip), ("secondary", self.pihole_secondary_ip)):
+            registry.register(
+                f"pihole_{role}", self.check_pihole_api, args=(ip, role.capitalize()),
+                label=f"Pi-hole {role.capitalize()}", timeout=6,
+                depends_on=container_dep(f"pihole_{role}")
+            )
         
-        success, message = self.check_unbound_dns(self.unbound_secondary_ip, "Secondary")
-        self.results["checks"]["unbound_secondary"] = {
-            "status": "pass" if success else "fail",
-            "message": message
-        }
-        if not success:
-            self.results["status"] = "degraded"
-            self.results["errors"].append(f"Unbound Secondary: {message}")
+        # Check Unbound instances
+        for role, ip in (("primary", self.unbound_primary_ip), ("secondary", self.unbound_secondary_ip)):
+            registry.register(
+                f"unbound_{role}", self.check_unbound_dns, args=(ip, role.capitalize()),
+                label=f"Unbound {role.capitalize()}", timeout=6,
+                depends_on=container_dep(f"unbound_{role}")
+            )
         
         # Check DNSSEC validation when smart prefetch is enabled
-        if self.unbound_smart_prefetch:
-            success, message = self.check_dnssec_validation(self.unbound_primary_ip)
-            self.results["checks"]["dnssec_validation"] = {
-                "status": "pass" if success else "fail",
-                "message": message
-            }
-            if not success:
-                self.results["status"] = "degraded"
-                self.results["errors"].append(f"DNSSEC Validation: {message}")
+        registry.register(
+            "dnssec_validation", self.check_dnssec_validation, args=(self.unbound_primary_ip,),
+            label="DNSSEC Validation", timeout=11, depends_on=("unbound_primary",),
+            enabled=self.unbound_smart_prefetch
+        )
         
-        # Check VIP status
-        success, message = self.check_vip_status()
-        self.results["checks"]["keepalived_vip"] = {
-            "status": "pass" if success else "fail",
-            "message": message
-        }
-        if not success:
-            self.results["status"] = "unhealthy"
-            self.results["errors"].append(f"Keepalived VIP: {message}")
+        # Resolver tail latency (opt-in: sends HEALTH_LATENCY_SAMPLES queries per target)
+        latency_timeout = self.latency_window + 4
+        for target, ip, dep in (
+            ("pihole_primary", self.pihole_primary_ip, container_dep("pihole_primary")),
+            ("pihole_secondary", self.pihole_secondary_ip, container_dep("pihole_secondary")),
+            ("unbound_primary", self.unbound_primary_ip, container_dep("unbound_primary")),
+            ("unbound_secondary", self.unbound_secondary_ip, container_dep("unbound_secondary")),
+            ("vip", self.vip, ()),
+        ):
+            registry.register(
+                f"latency_{target}", self.check_resolver_latency, args=(ip,),
+                label=f"Latency {target}", timeout=latency_timeout,
+                depends_on=dep, enabled=self.latency_probe
+            )
         
-        # Check critical Docker containers
-        containers = ["pihole_primary", "pihole_secondary", "unbound_primary", "unbound_secondary", "keepalived"]
-        for container in containers:
-            success, message = self.check_docker_container(container)
-            self.results["checks"][f"container_{container}"] = {
-                "status": "pass" if success else "fail",
-                "message": message
-            }
-            if not success:
-                self.results["status"] = "degraded"
-                self.results["errors"].append(f"Container {container}: {message}")
+        # Cache-hit vs full recursion on each Unbound (opt-in)
+        for role, ip in (("primary", self.unbound_primary_ip), ("secondary", self.unbound_secondary_ip)):
+            registry.register(
+                f"recursion_unbound_{role}", self.check_recursion_path, args=(ip,),
+                label=f"Recursion Unbound {role.capitalize()}", timeout=11,
+                depends_on=container_dep(f"unbound_{role}"), enabled=self.recursion_probe
+            )
+        
+        # A missing VIP is the only critical failure
+        registry.register(
+            "keepalived_vip", self.check_vip_status,
+            label="Keepalived VIP", severity="unhealthy", timeout=4
+        )
+        
+        # Check critical Docker containers (prerequisites of the checks above)
+        for container in self.containers:
+            registry.register(
+                f"container_{container}", self.check_docker_container, args=(container,),
+                label=f"Container {container}", timeout=4
+            )
         
         # Check DoH/DoT gateway if enabled
-        if self.doh_dot_enabled:
-            # Check gateway container
-            success, message = self.check_docker_container("orion-dns-gateway")
-            self.results["checks"]["container_dns_gateway"] = {
-                "status": "pass" if success else "fail",
-                "message": message
-            }
-            if not success:
-                self.results["status"] = "degraded"
-                self.results["errors"].append(f"DNS Gateway Container: {message}")
-            
-            # Check DoH gateway API
-            success, message = self.check_doh_gateway()
-            self.results["checks"]["doh_gateway"] = {
-                "status": "pass" if success else "fail",
-                "message": message
-            }
-            if not success:
-                self.results["status"] = "degraded"
-                self.results["errors"].append(f"DoH Gateway: {message}")
-            
-            # Check DoT port connectivity
-            success, message = self.check_dot_connectivity()
-            self.results["checks"]["dot_connectivity"] = {
-                "status": "pass" if success else "fail",
-                "message": message
+        gateway_dep = ("container_dns_gateway",) if docker_available else ()
+        registry.register(
+            "container_dns_gateway", self.check_docker_container, args=("orion-dns-gateway",),
+            label="DNS Gateway Container", timeout=4, enabled=self.doh_dot_enabled
+        )
+        registry.register(
+            "doh_gateway", self.check_doh_gateway,
+            label="DoH Gateway", timeout=6, depends_on=gateway_dep, enabled=self.doh_dot_enabled
+        )
+        registry.register(
+            "doh_query", self.check_doh_query,
+            label="DoH Query", timeout=11, depends_on=gateway_dep, enabled=self.doh_dot_enabled
+        )
+        registry.register(
+            "dot_connectivity", self.check_dot_connectivity,
+            label="DoT Connectivity", timeout=11, depends_on=gateway_dep, enabled=self.doh_dot_enabled
+        )
+        
+        registry.load_overrides()
+        return registry
+    
+    @staticmethod
+    def _escalate(results: Dict, status: str):
+        """Raise overall status to the given level, never lowering it"""
+        if STATUS_SEVERITY[status] > STATUS_SEVERITY[results["status"]]:
+            results["status"] = status
+    
+    def _summarize(self, results: Dict):
+        """Derive the overall status and error list from the per-check results"""
+        results["status"] = "healthy"
+        results["errors"] = []
+        for name, check in results["checks"].items():
+            spec = self.registry.get(name)
+            # Skipped checks are already accounted for by their failed prerequisite
+            if check["status"] == "fail":
+                self._escalate(results, spec.severity)
+                results["errors"].append(f"{spec.label}: {check['message']}")
+            elif check["status"] == "warn":
+                self._escalate(results, "degraded")
+                results["errors"].append(f"{spec.label}: {check['message']}")
+    
+    def merge_results(self, base: Dict, partial: Dict) -> Dict:
+        """Overlay a partial run's checks on a full result and re-derive its status"""
+        merged = {"timestamp": partial["timestamp"], "checks": dict(base["checks"])}
+        merged["checks"].update(partial["checks"])
+        self._summarize(merged)
+        return merged
+    
+    def run_checks(self, only: Optional[List[str]] = None) -> Dict:
+        """Run enabled health checks concurrently and return results
+        
+        `only` limits the run to the named checks plus their prerequisites
+        (so dependency skipping still applies). Only full runs replace
+        self.results, which print_results() and get_exit_code() report on.
+        """
+        results = {
+            "timestamp": datetime.now().isoformat(),
+            "status": "healthy",
+            "checks": {},
+            "errors": []
+        }
+        
+        wanted = self.registry.with_prerequisites(only) if only is not None else None
+        specs = self.registry.enabled_specs(only=wanted)
+        runner = CheckRunner(max_workers=self.max_workers, deadline=self.deadline)
+        outcomes = runner.run([spec.job() for spec in specs])
+        
+        # Merge in declaration order so the report layout is deterministic
+        for spec, outcome in zip(specs, outcomes):
+            status = "skipped" if outcome.skipped else outcome.status
+            results["checks"][spec.name] = {
+                "status": status,
+                "message": outcome.message,
+                "duration_ms": round(outcome.duration * 1000, 1)
             }
-            if not success:
-                self.results["status"] = "degraded"
-                self.results["errors"].append(f"DoT Connectivity: {message}")
+            if outcome.details:
+                results["checks"][spec.name]["details"] = outcome.details
+        self._summarize(results)
+        
+        if self.timeouts is not None:
+            self.timeouts.save()
         
-        return self.results
+        if only is None:
+            self.results = results
+        return results
     
     def print_results(self, format_type: str = "text"):
         """Print health check results in specified format"""
@@ -372,7 +655,7 @@ class HealthChecker:
             
             # Print individual checks
             for check_name, check_data in self.results["checks"].items():
-                status_icon = "✅" if check_data["status"] == "pass" else "❌"
+                status_icon = {"pass": "✅", "warn": "⚠️ ", "skipped": "⏭️ "}.get(check_data["status"], "❌")
                 print(f"{status_icon} {check_name}: {check_data['message']}")
             
             # Print errors if any
@@ -411,11 +694,54 @@ def main():
         action="store_true",
         help="Suppress output, only return exit code"
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Global deadline for the whole run in seconds (default: $HEALTH_DEADLINE or 8)"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="Maximum checks run in parallel (default: $HEALTH_MAX_WORKERS or 8)"
+    )
+    
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run continuously and serve Prometheus metrics instead of exiting after one run"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=float(os.getenv("HEALTH_DAEMON_INTERVAL", "15")),
+        help="Seconds between runs in daemon mode (default: $HEALTH_DAEMON_INTERVAL or 15)"
+    )
+    parser.add_argument(
+        "--listen",
+        default=os.getenv("HEALTH_DAEMON_LISTEN", "127.0.0.1:9188"),
+        help="host:port for the daemon's /metrics and /health (default: 127.0.0.1:9188)"
+    )
+    parser.add_argument(
+        "--socket",
+        default=os.getenv("HEALTH_DAEMON_SOCKET", ""),
+        help="Also serve the daemon endpoints on this Unix socket (default: $HEALTH_DAEMON_SOCKET)"
+    )
     
     args = parser.parse_args()
     
-    # Create and run health checker
     checker = HealthChecker()
+    if args.deadline is not None:
+        checker.deadline = args.deadline
+    if args.max_workers is not None:
+        checker.max_workers = args.max_workers
+    
+    if args.daemon:
+        from health_monitor import run_daemon
+        host, _, port = args.listen.rpartition(":")
+        run_daemon(host or "0.0.0.0", int(port), args.interval, socket_path=args.socket, checker=checker)
+        return
+    
+    # Run health checker
     results = checker.run_checks()
     
     # Print results unless quiet mode
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Long-lived health state for Orion Sentinel DNS HA
+
+HealthMonitor owns a single HealthChecker (so pooled HTTP sessions, cached
+Pi-hole SIDs and the Docker listing cache survive between runs), runs the
+check suite on a schedule and keeps in memory:
+- The last full result
+- Per-check duration histograms
+- Per-check pass/fail state and last-success timestamps
+
+render_metrics() exposes that state in the Prometheus text format without
+triggering any probes, so it can be scraped as often as needed.
+
+run_daemon() backs `health_checker.py --daemon`: it serves /metrics, the
+last result on /health and a one-line /status (for healthcheck_client.py)
+from a small HTTP listener, optionally also on a Unix socket.
+
+BoundedThreadingHTTPServer is the server core shared with dns-health-service:
+one thread per connection so cheap endpoints never wait behind slow ones,
+with a cap on concurrent connections.
+"""
+
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from health_checker import STATUS_SEVERITY, HealthChecker
+
+# Numeric encoding of per-check statuses for orion_health_check_status
+CHECK_STATUS_CODES = {"pass": 0, "warn": 1, "fail": 2, "skipped": 3}
+
+# Check durations range from sub-millisecond (cached Docker listing) to the global deadline
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def duration_bucket(seconds: float, buckets: Tuple[float, ...] = DURATION_BUCKETS) -> str:
+    """Upper bound of the histogram bucket a duration falls in, as a Prometheus `le` label"""
+    for bound in buckets:
+        if seconds <= bound:
+            return f"{bound:g}"
+    return "+Inf"
+
+
+# Coarse bands of a check's measured latency for /health/stream change detection;
+# a latency only leaves its band once it is LATENCY_HYSTERESIS beyond the edges
+LATENCY_BANDS = (0.01, 0.1, 1.0)
+LATENCY_HYSTERESIS = 0.25
+
+
+def latency_band(seconds: float, previous: Optional[str] = None,
+                 bands: Tuple[float, ...] = LATENCY_BANDS) -> str:
+    """Band a measured latency falls in, as an `le` label, sticking to `previous` near its edges"""
+    labels = [f"{bound:g}" for bound in bands] + ["+Inf"]
+    if previous in labels:
+        i = labels.index(previous)
+        lower = bands[i - 1] if i > 0 else 0.0
+        upper = bands[i] if i < len(bands) else float("inf")
+        if lower * (1 - LATENCY_HYSTERESIS) <= seconds <= upper * (1 + LATENCY_HYSTERESIS):
+            return previous
+    return duration_bucket(seconds, bands)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+class _Flight:
+    """One in-flight check run that concurrent callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+
+
+class HealthMonitor:
+    """Run checks on a schedule and keep the latest results and statistics in memory"""
+
+    def __init__(self, checker: Optional[HealthChecker] = None, interval: float = 15.0):
+        self.checker = checker or HealthChecker()
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Notified whenever the cached result changes (full run or merged update);
+        # _generation counts the changes
+        self._updated = threading.Condition(self._lock)
+        self._generation = 0
+        # In-flight runs keyed by the checks they cover ("" = full suite)
+        self._inflight: Dict[str, _Flight] = {}
+        # Executed and coalesced refreshes, by kind ("full" suite or "partial" subset)
+        self._runs: Dict[str, int] = {"full": 0, "partial": 0}
+        self._coalesced: Dict[str, int] = {"full": 0, "partial": 0}
+        self._stop = threading.Event()
+        self._thread = None
+        self._result: Optional[Dict] = None
+        self._completed_at = 0.0
+        self._completed_wall = 0.0
+        self._last_run_duration = 0.0
+        self._durations: Dict[str, Histogram] = {}
+        self._last_success: Dict[str, float] = {}
+        # A VIP move reported by the netlink watcher updates the cached result at once
+        self.checker.vip_change_callback = self._on_vip_change
+
+    def refresh(self, only: Optional[Iterable[str]] = None) -> Dict:
+        """Run the check suite now, or just `only` and its prerequisites
+
+        Single-flight: when an identical run is already in progress, callers
+        wait for it and share its result instead of starting another. Only
+        full runs are recorded as the cached result.
+        """
+        only = sorted(set(only)) if only is not None else None
+        key = ",".join(only) if only is not None else ""
+        kind = "full" if only is None else "partial"
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                leader = True
+            else:
+                self._coalesced[kind] += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            started = time.monotonic()
+            result = self.checker.run_checks(only=only)
+            finished = time.monotonic()
+            with self._lock:
+                self._runs[kind] += 1
+            if only is None:
+                self._record(result, finished - started, finished)
+            flight.result = result
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _record(self, result: Dict, run_duration: float, completed_at: float):
+        """Store a result and fold its per-check durations into the statistics"""
+        wall = time.time()
+        with self._lock:
+            self._result = result
+            self._completed_at = completed_at
+            self._completed_wall = wall
+            self._last_run_duration = run_duration
+            self._generation += 1
+            self._updated.notify_all()
+            self._observe_checks(result, wall)
+
+    def _observe_checks(self, result: Dict, wall: float):
+        """Fold per-check durations and successes into the statistics; caller holds the lock"""
+        for name, check in result["checks"].items():
+            if check["status"] == "skipped":
+                continue
+            self._durations.setdefault(name, Histogram()).observe(check["duration_ms"] / 1000.0)
+            if check["status"] in ("pass", "warn"):
+                self._last_success[name] = wall
+
+    def update(self, only: Iterable[str]) -> Dict:
+        """Re-run just `only` and merge it into the cached full result
+
+        The merged result gets a new generation, so /health, /metrics and
+        /health/stream see the change without waiting for the next full run.
+        Before the first full run there is nothing to merge into.
+        """
+        partial = self.refresh(only=only)
+        wall = time.time()
+        with self._lock:
+            if self._result is None:
+                return partial
+            self._result = self.checker.merge_results(self._result, partial)
+            self._generation += 1
+            self._updated.notify_all()
+            self._observe_checks(partial, wall)
+            return self._result
+
+    def _on_vip_change(self):
+        """Re-check the VIP off the watcher thread so its owner change is published at once"""
+        def run():
+            try:
+                self.update(["keepalived_vip"])
+            except Exception as e:
+                print(f"VIP refresh failed: {e}")
+        threading.Thread(target=run, name="vip-refresh", daemon=True).start()
+
+    @property
+    def generation(self) -> int:
+        """Number of cached results recorded so far; changes whenever the cached result does"""
+        with self._lock:
+            return self._generation
+
+    def snapshot(self) -> Tuple[Optional[Dict], float]:
+        """Return (last result, age in seconds); result is None before the first run"""
+        with self._lock:
+            if self._result is None:
+                return None, float("inf")
+            return self._result, time.monotonic() - self._completed_at
+
+    def wait_for_update(self, generation: int, timeout: float) -> Tuple[Optional[Dict], int]:
+        """Block until a result newer than `generation` is recorded or `timeout` passes
+
+        Returns (result, generation); the result is None on timeout.
+        """
+        with self._updated:
+            self._updated.wait_for(lambda: self._generation > generation, timeout)
+            if self._generation > generation:
+                return self._result, self._generation
+            return None, generation
+
+    def get(self, max_age: float, fresh: bool = False,
+            only: Optional[Iterable[str]] = None) -> Tuple[Dict, float, Optional[int]]:
+        """Return (result, age, generation), running checks synchronously when forced or older than max_age
+
+        With `only`, a stale cache is refreshed by running just those checks
+        (and their prerequisites) rather than the full suite; such partial
+        results are not cached and come back with generation None.
+        """
+        with self._lock:
+            result, generation = self._result, self._generation
+            age = time.monotonic() - self._completed_at
+        if fresh or result is None or age > max_age:
+            result = self.refresh(only=only)
+            age = 0.0
+            generation = self.generation if only is None else None
+        return result, age, generation
+
+    def start(self):
+        """Start the background refresh loop"""
+        self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Health refresh failed: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def render_metrics(self) -> str:
+        """Render the in-memory state in the Prometheus text exposition format"""
+        with self._lock:
+            result = self._result
+            lines: List[str] = []
+
+            lines += [
+                "# HELP orion_health_runs_total Completed health check runs, full suite or partial subset",
+                "# TYPE orion_health_runs_total counter",
+            ]
+            lines += [f"orion_health_runs_total{_labels(kind=kind)} {count}" for kind, count in self._runs.items()]
+            lines += [
+                "# HELP orion_health_refresh_coalesced_total Refresh requests that joined an in-flight run instead of starting one",
+                "# TYPE orion_health_refresh_coalesced_total counter",
+            ]
+            lines += [
+                f"orion_health_refresh_coalesced_total{_labels(kind=kind)} {count}"
+                for kind, count in self._coalesced.items()
+            ]
+            if result is None:
+                return "\n".join(lines) + "\n"
+
+            lines += [
+                "# HELP orion_health_status Overall status (0=healthy, 1=degraded, 2=unhealthy)",
+                "# TYPE orion_health_status gauge",
+                f"orion_health_status {STATUS_SEVERITY.get(result['status'], 2)}",
+                "# HELP orion_health_last_run_timestamp_seconds Completion time of the last run",
+                "# TYPE orion_health_last_run_timestamp_seconds gauge",
+                f"orion_health_last_run_timestamp_seconds {self._completed_wall:.3f}",
+                "# HELP orion_health_last_run_duration_seconds Wall time of the last run",
+                "# TYPE orion_health_last_run_duration_seconds gauge",
+                f"orion_health_last_run_duration_seconds {self._last_run_duration:.6f}",
+                "# HELP orion_health_result_age_seconds Age of the cached result being served",
+                "# TYPE orion_health_result_age_seconds gauge",
+                f"orion_health_result_age_seconds {time.monotonic() - self._completed_at:.3f}",
+            ]
+
+            lines += [
+                "# HELP orion_health_check_status Check status in the last run (0=pass, 1=warn, 2=fail, 3=skipped)",
+                "# TYPE orion_health_check_status gauge",
+            ]
+            for name, check in result["checks"].items():
+                code = CHECK_STATUS_CODES.get(check["status"], 2)
+                lines.append(f"orion_health_check_status{_labels(check=name)} {code}")
+
+            lines += [
+                "# HELP orion_health_check_latency_seconds Duration of the check in the last run",
+                "# TYPE orion_health_check_latency_seconds gauge",
+            ]
+            for name, check in result["checks"].items():
+                lines.append(
+                    f"orion_health_check_latency_seconds{_labels(check=name)} {check['duration_ms'] / 1000.0:.6f}"
+                )
+
+            lines += [
+                "# HELP orion_health_check_passing Whether the check passed in the last run (1=pass/warn, 0=fail/skipped)",
+                "# TYPE orion_health_check_passing gauge",
+            ]
+            for name, check in result["checks"].items():
+                passing = 1 if check["status"] in ("pass", "warn") else 0
+                lines.append(f"orion_health_check_passing{_labels(check=name)} {passing}")
+
+            lines += [
+                "# HELP orion_health_check_last_success_timestamp_seconds Last time the check passed",
+                "# TYPE orion_health_check_last_success_timestamp_seconds gauge",
+            ]
+            for name, ts in self._last_success.items():
+                lines.append(f"orion_health_check_last_success_timestamp_seconds{_labels(check=name)} {ts:.3f}")
+
+            lines += [
+                "# HELP orion_health_check_duration_seconds Duration of individual health checks",
+                "# TYPE orion_health_check_duration_seconds histogram",
+            ]
+            for name, hist in self._durations.items():
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(
+                        f"orion_health_check_duration_seconds_bucket{_labels(check=name, le=f'{bound:g}')} {count}"
+                    )
+                lines.append(f"orion_health_check_duration_seconds_bucket{_labels(check=name, le='+Inf')} {hist.count}")
+                lines.append(f"orion_health_check_duration_seconds_sum{_labels(check=name)} {hist.sum:.6f}")
+                lines.append(f"orion_health_check_duration_seconds_count{_labels(check=name)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+class BoundedThreadingHTTPServer(ThreadingHTTPServer):
+    """Thread-per-connection HTTP server with a cap on concurrent connections
+
+    Connections over the cap get an immediate 503 instead of a thread, so a
+    flood of pollers cannot exhaust memory. Handlers should set `timeout` so
+    idle keep-alive connections give their slot back.
+
+    Long-lived responses (event streams) call begin_stream(), which moves the
+    connection from the general pool to a separate one of max_streams slots,
+    so open dashboards can never starve /live and /ready of connections.
+    """
+
+    daemon_threads = True
+    # Queued connections the kernel holds while all threads are busy accepting
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_connections: int = 64,
+                 max_streams: int = 16):
+        self.max_connections = max_connections
+        self.max_streams = max_streams
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._stream_slots = threading.BoundedSemaphore(max_streams)
+        # Per connection thread: whether it holds a stream slot instead of a general one
+        self._streaming = threading.local()
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        self._streaming.active = False
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            if self._streaming.active:
+                self._stream_slots.release()
+            else:
+                self._slots.release()
+
+    def begin_stream(self) -> bool:
+        """Move the calling connection to the stream pool; False when that pool is full"""
+        if self._streaming.active:
+            return True
+        if not self._stream_slots.acquire(blocking=False):
+            return False
+        self._streaming.active = True
+        self._slots.release()
+        return True
+
+    def _reject(self, request):
+        try:
+            request.sendall(
+                b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n"
+                b"Retry-After: 1\r\nConnection: close\r\n\r\n"
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """Serve the monitor's in-memory state; never triggers probes"""
+
+    monitor: HealthMonitor = None
+    # Keep-alive for scrapers; idle connections are closed after this many seconds
+    protocol_version = "HTTP/1.1"
+    timeout = 30
+    # Headers and body are written separately; without this Nagle delays keep-alive replies
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.monitor.render_metrics().encode()
+            self._send(200, "text/plain; version=0.0.4; charset=utf-8", body)
+        elif self.path == "/status":
+            # "<status> <age seconds>" so the healthcheck client needs no JSON parser
+            result, age = self.monitor.snapshot()
+            if result is None:
+                self._send(503, "text/plain", b"unknown\n")
+            else:
+                self._send(200, "text/plain", f"{result['status']} {age:.3f}\n".encode())
+        elif self.path == "/health":
+            result, age = self.monitor.snapshot()
+            if result is None:
+                body = json.dumps({"status": "unknown", "error": "no completed run yet"})
+                self._send(503, "application/json", body.encode())
+            else:
+                body = json.dumps(dict(result, age_seconds=round(age, 3)))
+                self._send(200, "application/json", body.encode())
+        else:
+            self.send_error(404, "Endpoint not found")
+
+    def _send(self, status_code: int, content_type: str, body: bytes):
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Scrapes are frequent; keep the daemon's log quiet"""
+
+
+class _UnixDaemonHandler(DaemonHandler):
+    """DaemonHandler for Unix socket connections, which have no TCP options or peer address"""
+
+    disable_nagle_algorithm = False
+
+    def address_string(self):
+        return "unix"
+
+
+class _UnixDaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _serve_unix_socket(path: str) -> _UnixDaemonServer:
+    """Serve the daemon endpoints on a Unix socket, replacing a stale socket file"""
+    if os.path.exists(path):
+        os.unlink(path)
+    server = _UnixDaemonServer(path, _UnixDaemonHandler)
+    threading.Thread(target=server.serve_forever, name="health-daemon-unix", daemon=True).start()
+    return server
+
+
+def run_daemon(host: str, port: int, interval: float, socket_path: str = "",
+               checker: Optional[HealthChecker] = None):
+    """Run checks every `interval` seconds and serve /metrics, /health and /status until interrupted"""
+    monitor = HealthMonitor(checker=checker, interval=interval).start()
+    DaemonHandler.monitor = monitor
+    httpd = BoundedThreadingHTTPServer((host, port), DaemonHandler)
+    unix_server = _serve_unix_socket(socket_path) if socket_path else None
+
+    print(f"Health checker daemon running every {interval:g}s")
+    print(f"  GET http://{host}:{port}/metrics - Prometheus metrics")
+    print(f"  GET http://{host}:{port}/health - Last check result")
+    print(f"  GET http://{host}:{port}/status - Last status and its age (for healthcheck_client.py)")
+    if socket_path:
+        print(f"  Also listening on unix://{socket_path}")
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        monitor.stop()
+        httpd.server_close()
+        if unix_server is not None:
+            unix_server.shutdown()
+            unix_server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Fast-start Docker HEALTHCHECK client for Orion Sentinel DNS HA
+
+Docker runs the healthcheck every few seconds per container, so this client
+imports nothing beyond os, sys and the C-level _socket module. It asks the
+running health daemon (`health_checker.py --daemon`) for its last result via
+GET /status, which returns a plain-text "<status> <age seconds>" line:
+- Over the Unix socket HEALTH_DAEMON_SOCKET when set
+- Otherwise over HTTP to HEALTH_DAEMON_LISTEN (default 127.0.0.1:9188)
+
+When the daemon is unreachable, has no result yet or its result is older
+than HEALTHCHECK_MAX_AGE seconds, the client execs the full health checker
+instead (set HEALTHCHECK_FALLBACK=0 to report unhealthy instead).
+
+Startup budget: under 50 ms when the daemon answers, measured with
+`python3 -I -S` (as docker-healthcheck.sh runs it) and verified by
+scripts/test-suite.sh.
+
+Exit codes match health_checker.py: 0 healthy, 1 degraded, 2 unhealthy.
+"""
+
+import os
+import sys
+
+# The C module directly: socket.py pulls in enum and selectors, which alone
+# costs more startup time than the rest of this client
+import _socket as socket
+
+EXIT_CODES = {"healthy": 0, "degraded": 1, "unhealthy": 2}
+
+
+def ask_daemon(timeout):
+    """Return (status, age seconds) from the daemon's /status, or None if it has no result"""
+    socket_path = os.environ.get("HEALTH_DAEMON_SOCKET", "")
+    if socket_path:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = socket_path
+    else:
+        host, _, port = os.environ.get("HEALTH_DAEMON_LISTEN", "127.0.0.1:9188").rpartition(":")
+        if host in ("", "0.0.0.0"):
+            host = "127.0.0.1"
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = (host, int(port))
+
+    sock.settimeout(timeout)
+    try:
+        sock.connect(target)
+        # HTTP/1.0 so the daemon closes the connection after one response
+        sock.sendall(b"GET /status HTTP/1.0\r\nHost: localhost\r\n\r\n")
+        data = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        sock.close()
+
+    head, _, body = data.partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0].split()
+    if len(status_line) < 2 or status_line[1] != b"200":
+        return None
+    status, age = body.split()[:2]
+    return status.decode(), float(age)
+
+
+def main():
+    quiet = "--quiet" in sys.argv
+    max_age = float(os.environ.get("HEALTHCHECK_MAX_AGE", "60"))
+
+    try:
+        answer = ask_daemon(float(os.environ.get("HEALTHCHECK_TIMEOUT", "1")))
+    except (OSError, ValueError):
+        answer = None
+
+    if answer is not None:
+        status, age = answer
+        if status in EXIT_CODES and age <= max_age:
+            if not quiet:
+                print(f"{status} (from health daemon, {age:.1f}s old)")
+            return EXIT_CODES[status]
+        reason = f"daemon result is {age:.0f}s old" if status in EXIT_CODES else f"daemon status {status}"
+    else:
+        reason = "health daemon unavailable"
+
+    if os.environ.get("HEALTHCHECK_FALLBACK", "1") != "1":
+        print(f"unhealthy ({reason})")
+        return 2
+
+    # Direct probe: replace this process with the full checker so its exit code is ours
+    if not quiet:
+        print(f"{reason}, running health_checker.py")
+        sys.stdout.flush()
+    checker = os.path.join(os.path.dirname(os.path.abspath(__file__)), "health_checker.py")
+    os.execv(sys.executable, [sys.executable, checker, "--quiet", "--format", "json"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Multi-sample DNS latency probing for Orion Sentinel DNS HA health checks
+
+Sends N queries to a resolver from a single UDP socket, either all at once
+(burst) or evenly spread over a window, matches answers by transaction ID
+and summarises the latency distribution (min/p50/p95/p99/max) and loss.
+
+A single pass/fail query says nothing about tail latency; these numbers
+are what clients resolving through the VIP actually experience.
+
+probe_cache_and_recursion() separates cache hits (a warmed corpus of
+popular names) from full recursion (random, never-cached subdomains) so a
+broken upstream path shows up before a warm cache expires.
+"""
+
+import secrets
+import select
+import socket
+import struct
+import time
+from typing import Dict, List, Tuple
+
+import dns_probe
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms: List[float], sent: int, errors: int = 0) -> Dict:
+    """Summarise successful latencies (ms) out of `sent` queries"""
+    values = sorted(latencies_ms)
+    lost = sent - len(values)
+    summary = {
+        "samples": sent,
+        "answered": len(values),
+        "errors": errors,
+        "loss_pct": round(100.0 * lost / sent, 1) if sent else 0.0,
+    }
+    if values:
+        summary.update({
+            "min_ms": round(values[0], 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(values[-1], 3),
+        })
+    return summary
+
+
+def _probe(server: str, qnames: List[str], port: int, interval: float,
+           timeout: float, ok_rcodes: Tuple[int, ...] = (0,)) -> Tuple[List[float], int]:
+    """Send one query per name from a single socket and collect (latencies ms, errors)
+
+    Queries go out `interval` seconds apart (0 = all at once). Responses
+    are matched by transaction ID; an RCODE outside ok_rcodes counts as an error.
+    """
+    start = time.perf_counter()
+    send_at = [start + i * interval for i in range(len(qnames))]
+    sent_at: Dict[int, float] = {}
+    latencies: List[float] = []
+    errors = 0
+    consumed = 0
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.connect((server, port))
+        sock.setblocking(False)
+        next_send = 0
+        deadline = send_at[-1] + timeout if send_at else start
+
+        while True:
+            now = time.perf_counter()
+            while next_send < len(qnames) and send_at[next_send] <= now:
+                query_id, packet = dns_probe.build_query(qnames[next_send])
+                while query_id in sent_at:
+                    query_id, packet = dns_probe.build_query(qnames[next_send])
+                try:
+                    sock.send(packet)
+                    sent_at[query_id] = time.perf_counter()
+                except OSError:
+                    errors += 1
+                next_send += 1
+
+            if next_send >= len(qnames) and consumed >= len(sent_at):
+                break
+            if now >= deadline:
+                break
+
+            wake = send_at[next_send] if next_send < len(qnames) else deadline
+            readable, _, _ = select.select([sock], [], [], max(0.0, wake - now))
+            if not readable:
+                continue
+            try:
+                data = sock.recv(65535)
+            except OSError:
+                # ICMP port unreachable etc.: nothing to match, keep waiting
+                continue
+            received = time.perf_counter()
+            if len(data) < 4:
+                continue
+            response_id = struct.unpack("!H", data[:2])[0]
+            started = sent_at.get(response_id)
+            if started is None or started < 0:
+                continue
+            # Mark as consumed so duplicates are ignored
+            sent_at[response_id] = -1.0
+            consumed += 1
+            if data[3] & 0x0F in ok_rcodes:
+                latencies.append((received - started) * 1000.0)
+            else:
+                errors += 1
+
+    return latencies, errors
+
+
+def sample_latency(server: str, qname: str = "google.com", port: int = 53,
+                   samples: int = 20, mode: str = "burst", window: float = 1.0,
+                   timeout: float = 2.0) -> Dict:
+    """Probe a resolver `samples` times and return the latency summary
+
+    Error responses (SERVFAIL, REFUSED, ...) count as lost samples and are
+    also reported separately under "errors".
+    """
+    interval = window / samples if mode == "spread" and samples > 1 else 0.0
+    latencies, errors = _probe(server, [qname] * samples, port, interval, timeout)
+    return summarize(latencies, samples, errors)
+
+
+def random_subdomains(zone: str, count: int) -> List[str]:
+    """Cache-busting names: random labels under `zone` that no resolver can have cached"""
+    return [f"{secrets.token_hex(8)}.{zone.strip('.')}" for _ in range(count)]
+
+
+def probe_cache_and_recursion(server: str, corpus: List[str], zone: str = "",
+                              recursion_samples: int = 5, port: int = 53,
+                              timeout: float = 3.0) -> Dict:
+    """Measure cached and recursive resolution as two separate distributions
+
+    The corpus is queried twice: the first pass warms the cache, the second
+    is reported as "cached". Random subdomains of `zone` are never cached,
+    so every one of them exercises the full recursion path; NXDOMAIN is the
+    expected answer and counts as success.
+    """
+    _probe(server, corpus, port, 0.0, timeout)
+    cached, cached_errors = _probe(server, corpus, port, 0.0, timeout)
+    result = {"cached": summarize(cached, len(corpus), cached_errors)}
+
+    if zone:
+        names = random_subdomains(zone, recursion_samples)
+        recursive, recursive_errors = _probe(server, names, port, 0.0, timeout, ok_rcodes=(0, 3))
+        result["recursive"] = summarize(recursive, len(names), recursive_errors)
+    return result
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for the Orion Sentinel DNS health HTTP service
+
+Starts dns-health-service.py against in-process stand-ins for everything it
+probes, then drives each endpoint with a configurable number of concurrent
+keep-alive clients and reports throughput and latency percentiles:
+- Pi-hole HTTP API (v6 /api/auth and /api/stats/summary)
+- DNS on port 53 (Pi-hole, Unbound) and 5335 (Unbound DNSSEC), with the AD flag set
+- Docker Engine API on a Unix socket (GET /containers/json)
+
+The stubs bind loopback aliases (127.0.0.11-14) on the real ports, so run it
+as root (e.g. inside a container) or after
+`sysctl net.ipv4.ip_unprivileged_port_start=0`. `--stub-delay-ms` adds a
+per-response delay so probe cost is realistic.
+
+Use `--url` to benchmark an already running service instead, and `--json`
+to keep results for regression comparison.
+
+Examples:
+    sudo python3 health/loadtest.py
+    sudo python3 health/loadtest.py --concurrency 1,8,32 --requests 5000
+    python3 health/loadtest.py --url http://192.168.8.250:8888 --endpoints /health,/ready
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from latency_probe import percentile
+
+DEFAULT_ENDPOINTS = "/live,/ready,/health,/health/detailed,/metrics"
+
+STUB_PIHOLES = ("127.0.0.11", "127.0.0.12")
+STUB_UNBOUNDS = ("127.0.0.13", "127.0.0.14")
+STUB_CONTAINERS = ("pihole_primary", "pihole_secondary", "unbound_primary", "unbound_secondary", "keepalived")
+
+
+class StubDNSHandler(socketserver.BaseRequestHandler):
+    """Answer every UDP query with one A record and the AD flag"""
+
+    delay = 0.0
+
+    def handle(self):
+        data, sock = self.request
+        if self.delay:
+            time.sleep(self.delay)
+        sock.sendto(stub_dns_answer(data), self.client_address)
+
+
+def stub_dns_answer(query: bytes) -> bytes:
+    """NOERROR response with the query's question and a single A record"""
+    query_id, flags = struct.unpack("!HH", query[:4])
+    offset = 12
+    while query[offset]:
+        offset += query[offset] + 1
+    question = query[12:offset + 5]
+    # QR, RD copied, RA, AD
+    response_flags = 0x8000 | (flags & 0x0100) | 0x0080 | 0x0020
+    header = struct.pack("!HHHHHH", query_id, response_flags, 1, 1, 0, 0)
+    answer = b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, 60, 4) + bytes([192, 0, 2, 1])
+    return header + question + answer
+
+
+class StubPiholeHandler(BaseHTTPRequestHandler):
+    """Pi-hole v6 API: login and stats summary"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/api/auth":
+            self._json({"session": {"valid": True, "sid": "loadtest", "validity": 1800}})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_GET(self):
+        if self.path.startswith("/api/stats/summary"):
+            self._json({
+                "queries": {"total": 123456, "blocked": 23456},
+                "gravity": {"domains_being_blocked": 150000},
+            })
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def _json(self, data: Dict, status: int = 200):
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubDockerHandler(StubPiholeHandler):
+    """Docker Engine API: every monitored container running and healthy"""
+
+    def address_string(self):
+        return "docker.sock"
+
+    def do_GET(self):
+        if self.path.startswith("/containers/json"):
+            self._json([
+                {"Names": [f"/{name}"], "State": "running", "Status": "Up 2 hours (healthy)"}
+                for name in STUB_CONTAINERS
+            ])
+        else:
+            self._json({"message": "page not found"}, 404)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _UDPServer(socketserver.ThreadingUDPServer):
+    daemon_threads = True
+
+
+def start_stubs(delay: float, docker_socket: str) -> List[socketserver.BaseServer]:
+    """Start the DNS, Pi-hole and Docker stand-ins in background threads"""
+    StubDNSHandler.delay = delay
+    StubPiholeHandler.delay = delay
+    servers: List[socketserver.BaseServer] = []
+    for ip in STUB_PIHOLES:
+        servers.append(ThreadingHTTPServer((ip, 80), StubPiholeHandler))
+        servers.append(_UDPServer((ip, 53), StubDNSHandler))
+    for ip in STUB_UNBOUNDS:
+        servers.append(_UDPServer((ip, 53), StubDNSHandler))
+        servers.append(_UDPServer((ip, 5335), StubDNSHandler))
+    servers.append(_UnixHTTPServer(docker_socket, StubDockerHandler))
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return servers
+
+
+def start_service(port: int, docker_socket: str, state_dir: str) -> subprocess.Popen:
+    """Run dns-health-service.py against the stubs and wait until /live answers"""
+    env = dict(
+        os.environ,
+        PIHOLE_PRIMARY_IP=STUB_PIHOLES[0],
+        PIHOLE_SECONDARY_IP=STUB_PIHOLES[1],
+        UNBOUND_PRIMARY_IP=STUB_UNBOUNDS[0],
+        UNBOUND_SECONDARY_IP=STUB_UNBOUNDS[1],
+        VIP_ADDRESS="127.0.0.1",
+        PIHOLE_PASSWORD="loadtest",
+        DOCKER_HOST=f"unix://{docker_socket}",
+        HEALTH_STATE_DIR=state_dir,
+    )
+    service = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dns-health-service.py")
+    proc = subprocess.Popen(
+        [sys.executable, service, "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/live")
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("dns-health-service.py did not start")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def drive(host: str, port: int, path: str, requests: int, concurrency: int,
+          keepalive: bool = True, headers: Optional[Dict[str, str]] = None) -> Dict:
+    """Send `requests` GETs to `path` from `concurrency` client threads and summarise"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def take() -> bool:
+        with lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker():
+        nonlocal errors
+        conn = None
+        local: List[float] = []
+        local_statuses: Dict[int, int] = {}
+        local_errors = 0
+        while take():
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(host, port, timeout=60)
+                started = time.perf_counter()
+                conn.request("GET", path, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                local.append((time.perf_counter() - started) * 1000.0)
+                local_statuses[response.status] = local_statuses.get(response.status, 0) + 1
+                if not keepalive or response.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                if conn is not None:
+                    conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    values = sorted(latencies)
+    return {
+        "endpoint": path,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def print_table(results: List[Dict]):
+    print(f"{'endpoint':<20} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}  statuses")
+    for r in results:
+        statuses = " ".join(f"{k}x{v}" for k, v in r["statuses"].items())
+        print(f"{r['endpoint']:<20} {r['concurrency']:>5} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f} {r['errors']:>7}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the DNS health HTTP service")
+    parser.add_argument("--url", help="Benchmark a running service instead of starting one against stubs")
+    parser.add_argument("--endpoints", default=DEFAULT_ENDPOINTS,
+                        help=f"Comma-separated paths to drive (default: {DEFAULT_ENDPOINTS})")
+    parser.add_argument("--concurrency", default="1,16",
+                        help="Comma-separated client concurrency levels (default: 1,16)")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint and level (default: 2000)")
+    parser.add_argument("--no-keepalive", action="store_true", help="Open a new connection for every request")
+    parser.add_argument("--gzip", action="store_true", help="Send Accept-Encoding: gzip")
+    parser.add_argument("--stub-delay-ms", type=float, default=1.0,
+                        help="Delay added to every stub response (default: 1)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    proc = None
+    servers: List[socketserver.BaseServer] = []
+    tmpdir = tempfile.mkdtemp(prefix="orion-loadtest-")
+    try:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            docker_socket = os.path.join(tmpdir, "docker.sock")
+            try:
+                servers = start_stubs(args.stub_delay_ms / 1000.0, docker_socket)
+            except PermissionError:
+                print("Error: stubs bind ports 53/80/5335 on 127.0.0.11-14; run as root or set "
+                      "net.ipv4.ip_unprivileged_port_start=0", file=sys.stderr)
+                sys.exit(2)
+            host, port = "127.0.0.1", _free_port()
+            proc = start_service(port, docker_socket, tmpdir)
+
+        headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+        results = []
+        for level in (int(c) for c in args.concurrency.split(",") if c.strip()):
+            for path in (p.strip() for p in args.endpoints.split(",") if p.strip()):
+                # Warm up connections and the service cache before measuring
+                drive(host, port, path, min(50, args.requests), level, not args.no_keepalive, headers)
+                results.append(drive(host, port, path, args.requests, level, not args.no_keepalive, headers))
+
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            print_table(results)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=5)
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+rtnetlink address reader for Orion Sentinel DNS HA health checks
+
+Answers "is this address assigned to interface X" straight from the kernel
+over an AF_NETLINK socket, without spawning `ip addr show`, and with exact
+address matching (192.168.8.25 no longer matches 192.168.8.255).
+
+AddressWatcher subscribes to the kernel's address add/remove multicast
+groups so VIP moves are seen within milliseconds instead of at the next poll.
+"""
+
+import ipaddress
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Callable, List, Optional
+
+NETLINK_ROUTE = 0
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+
+NLM_F_REQUEST = 0x001
+NLM_F_DUMP = 0x300
+
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_IFADDRMSG = struct.Struct("=BBBBI")
+_RTATTR = struct.Struct("=HH")
+
+
+class NetlinkError(Exception):
+    """Raised when the kernel rejects or truncates a netlink request"""
+
+
+class InterfaceAddress:
+    """An address assigned to a network interface"""
+
+    def __init__(self, index: int, ifname: str, address: str, prefixlen: int, label: str = ""):
+        self.index = index
+        self.ifname = ifname
+        self.address = address
+        self.prefixlen = prefixlen
+        self.label = label
+
+
+class AddressEvent:
+    """An address being added to or removed from an interface"""
+
+    def __init__(self, action: str, address: InterfaceAddress):
+        self.action = action
+        self.address = address
+        self.timestamp = time.time()
+
+
+def is_supported() -> bool:
+    """True when the platform provides AF_NETLINK (Linux)"""
+    return hasattr(socket, "AF_NETLINK")
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _ifname(index: int) -> str:
+    try:
+        return socket.if_indextoname(index)
+    except OSError:
+        return f"if{index}"
+
+
+def _parse_messages(data: bytes):
+    """Yield (type, payload) for each netlink message in a datagram"""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            break
+        yield msg_type, data[offset + _NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def _parse_ifaddrmsg(payload: bytes) -> Optional[InterfaceAddress]:
+    """Decode an RTM_NEWADDR/RTM_DELADDR payload"""
+    if len(payload) < _IFADDRMSG.size:
+        return None
+    family, prefixlen, _, _, index = _IFADDRMSG.unpack_from(payload)
+    attrs = {}
+    offset = _IFADDRMSG.size
+    while offset + _RTATTR.size <= len(payload):
+        rta_len, rta_type = _RTATTR.unpack_from(payload, offset)
+        if rta_len < _RTATTR.size:
+            break
+        attrs[rta_type] = payload[offset + _RTATTR.size:offset + rta_len]
+        offset += _align(rta_len)
+
+    # IFA_LOCAL is the interface's own address; IFA_ADDRESS is the peer on point-to-point links
+    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+    if raw is None:
+        return None
+    if family == socket.AF_INET and len(raw) == 4:
+        address = socket.inet_ntop(socket.AF_INET, raw)
+    elif family == socket.AF_INET6 and len(raw) == 16:
+        address = socket.inet_ntop(socket.AF_INET6, raw)
+    else:
+        return None
+    label = attrs.get(IFA_LABEL, b"").rstrip(b"\x00").decode(errors="replace")
+    return InterfaceAddress(index, _ifname(index), address, prefixlen, label)
+
+
+def list_addresses(family: int = socket.AF_UNSPEC, timeout: float = 2.0) -> List[InterfaceAddress]:
+    """Dump every address currently assigned on the host"""
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.settimeout(timeout)
+        sock.bind((0, 0))
+        seq = int(time.time()) & 0xFFFFFFFF
+        payload = _IFADDRMSG.pack(family, 0, 0, 0, 0)
+        header = _NLMSGHDR.pack(_NLMSGHDR.size + len(payload), RTM_GETADDR,
+                                NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+        sock.send(header + payload)
+
+        addresses = []
+        while True:
+            data = sock.recv(65536)
+            for msg_type, body in _parse_messages(data):
+                if msg_type == NLMSG_DONE:
+                    return addresses
+                if msg_type == NLMSG_ERROR:
+                    errno = -struct.unpack_from("=i", body)[0] if len(body) >= 4 else 0
+                    raise NetlinkError(f"RTM_GETADDR failed: {os.strerror(errno)}")
+                if msg_type == RTM_NEWADDR:
+                    addr = _parse_ifaddrmsg(body)
+                    if addr:
+                        addresses.append(addr)
+
+
+def _matches(addr: InterfaceAddress, target, interface: Optional[str]) -> bool:
+    if interface and addr.ifname != interface:
+        return False
+    return ipaddress.ip_address(addr.address) == target
+
+
+def find_address(address: str, interface: Optional[str] = None) -> Optional[InterfaceAddress]:
+    """Return the assignment of an exact address (optionally on one interface), or None"""
+    target = ipaddress.ip_address(address)
+    family = socket.AF_INET if target.version == 4 else socket.AF_INET6
+    for addr in list_addresses(family):
+        if _matches(addr, target, interface):
+            return addr
+    return None
+
+
+class AddressWatcher:
+    """Track assignment of a single address from kernel netlink events
+
+    Runs a daemon thread bound to the IPv4/IPv6 address multicast groups;
+    `owner()` then answers from memory with no syscalls at all.
+    """
+
+    def __init__(self, address: str, interface: Optional[str] = None,
+                 on_change: Optional[Callable[[AddressEvent], None]] = None):
+        self.address = address
+        self.interface = interface
+        self.on_change = on_change
+        self._target = ipaddress.ip_address(address)
+        self._lock = threading.Lock()
+        self._owner: Optional[InterfaceAddress] = None
+        self._last_change = time.time()
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        """Subscribe to address events, then seed state with a full dump"""
+        # Subscribe first so nothing between the dump and the first recv is lost
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        self._sock.bind((0, RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        with self._lock:
+            self._owner = find_address(self.address, self.interface)
+        self._thread = threading.Thread(target=self._run, name="vip-netlink-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def last_change(self) -> float:
+        return self._last_change
+
+    def owner(self) -> Optional[InterfaceAddress]:
+        """Current assignment of the watched address, or None if not on this host"""
+        with self._lock:
+            return self._owner
+
+    def _run(self):
+        while self._sock:
+            try:
+                data = self._sock.recv(65536)
+            except OSError:
+                break
+            for msg_type, body in _parse_messages(data):
+                if msg_type not in (RTM_NEWADDR, RTM_DELADDR):
+                    continue
+                addr = _parse_ifaddrmsg(body)
+                if not addr or not _matches(addr, self._target, self.interface):
+                    continue
+                event = AddressEvent("add" if msg_type == RTM_NEWADDR else "remove", addr)
+                with self._lock:
+                    self._owner = addr if event.action == "add" else None
+                    self._last_change = event.timestamp
+                if self.on_change:
+                    try:
+                        self.on_change(event)
+                    except Exception:
+                        pass
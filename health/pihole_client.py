@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Pi-hole API client for Orion Sentinel DNS HA health checks
+
+Keeps one pooled keep-alive HTTP session per Pi-hole and speaks the
+Pi-hole v6 REST API:
+- Logs in once with PIHOLE_PASSWORD and caches the session ID (SID)
+- Refreshes the SID shortly before it expires (or on a 401)
+- Falls back to the legacy v5 `admin/api.php` endpoint when /api is absent
+
+Pi-hole v6 limits concurrent API sessions, so reusing the SID also stops
+health probes from exhausting the seats used by the web UI.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+# Re-login this many seconds before the SID would expire
+SID_REFRESH_MARGIN = 60
+
+# Password hashing makes logins much slower than stats reads, so they keep a fixed timeout
+LOGIN_TIMEOUT = 5.0
+
+
+class PiholeAPIError(Exception):
+    """Raised when the Pi-hole API returns an unusable response"""
+
+
+def pooled_session(pool_maxsize: int = 4) -> "requests.Session":
+    """Create a keep-alive session with a small connection pool"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class PiholeClient:
+    """Pi-hole API client with SID caching and v5 fallback"""
+
+    def __init__(self, base_url: str, password: str = "", timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.password = password
+        self.timeout = timeout
+        self.session = pooled_session()
+        # None until detected, then "v6" or "legacy"
+        self.api_version: Optional[str] = None
+        # Round-trip time of the last stats request alone, excluding login and version detection
+        self.last_request_seconds = 0.0
+        self._lock = threading.Lock()
+        self._sid: Optional[str] = None
+        self._sid_validity = 0.0
+        self._sid_expiry = 0.0
+
+    def _login(self) -> bool:
+        """Authenticate against /api/auth and cache the SID
+
+        Returns False when the endpoint does not exist (pre-v6 Pi-hole).
+        """
+        response = self.session.post(
+            f"{self.base_url}/api/auth",
+            json={"password": self.password},
+            timeout=max(self.timeout, LOGIN_TIMEOUT)
+        )
+        if response.status_code == 404:
+            return False
+        if response.status_code == 401:
+            raise PiholeAPIError("API authentication failed (check PIHOLE_PASSWORD)")
+        if response.status_code != 200:
+            raise PiholeAPIError(f"API login returned status {response.status_code}")
+
+        session = response.json().get("session", {})
+        if not session.get("valid"):
+            raise PiholeAPIError("API login rejected")
+        self._sid = session.get("sid")
+        self._sid_validity = float(session.get("validity", 300))
+        self._sid_expiry = time.monotonic() + self._sid_validity
+        return True
+
+    def _auth_headers(self, force_login: bool = False) -> Optional[Dict[str, str]]:
+        """Return SID headers, logging in when the cached SID is missing or near expiry
+
+        Returns None when the Pi-hole has no v6 auth endpoint.
+        """
+        if not self.password:
+            return {}
+        with self._lock:
+            if force_login or not self._sid or time.monotonic() > self._sid_expiry - SID_REFRESH_MARGIN:
+                if not self._login():
+                    return None
+            return {"X-FTL-SID": self._sid} if self._sid else {}
+
+    def _timed_get(self, url: str, headers: Optional[Dict[str, str]] = None) -> "requests.Response":
+        started = time.perf_counter()
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        self.last_request_seconds = time.perf_counter() - started
+        return response
+
+    def _summary_v6(self) -> Optional[Dict]:
+        """Fetch /api/stats/summary, or None when this is not a v6 Pi-hole"""
+        url = f"{self.base_url}/api/stats/summary"
+        headers = self._auth_headers()
+        if headers is None:
+            return None
+        response = self._timed_get(url, headers=headers)
+        if response.status_code == 401 and self.password:
+            # SID expired or was revoked server-side: log in again once
+            headers = self._auth_headers(force_login=True) or {}
+            response = self._timed_get(url, headers=headers)
+
+        if response.status_code == 404:
+            return None
+        if response.status_code == 401:
+            raise PiholeAPIError("API requires authentication (set PIHOLE_PASSWORD)")
+        if response.status_code != 200:
+            raise PiholeAPIError(f"API returned status {response.status_code}")
+
+        # SID validity is sliding: each authenticated request extends it
+        if self._sid:
+            with self._lock:
+                self._sid_expiry = time.monotonic() + self._sid_validity
+
+        data = response.json()
+        if "queries" not in data or "gravity" not in data:
+            raise PiholeAPIError("API returned invalid data")
+        return {
+            "api": "v6",
+            "domains_being_blocked": data["gravity"].get("domains_being_blocked", 0),
+            "dns_queries_today": data["queries"].get("total", 0),
+            "ads_blocked_today": data["queries"].get("blocked", 0),
+        }
+
+    def _summary_legacy(self) -> Dict:
+        """Fetch the v5 admin/api.php summary"""
+        response = self._timed_get(f"{self.base_url}/admin/api.php")
+        if response.status_code != 200:
+            raise PiholeAPIError(f"API returned status {response.status_code}")
+        data = response.json()
+        if "domains_being_blocked" not in data:
+            raise PiholeAPIError("API returned invalid data")
+        return {
+            "api": "legacy",
+            "domains_being_blocked": data.get("domains_being_blocked", 0),
+            "dns_queries_today": data.get("dns_queries_today", 0),
+            "ads_blocked_today": data.get("ads_blocked_today", 0),
+        }
+
+    def get_summary(self) -> Dict:
+        """Return blocking statistics from whichever API version the Pi-hole speaks"""
+        if self.api_version != "legacy":
+            summary = self._summary_v6()
+            if summary is not None:
+                self.api_version = "v6"
+                return summary
+            self.api_version = "legacy"
+        return self._summary_legacy()
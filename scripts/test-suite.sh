@@ -621,6 +621,200 @@ test_deployment_dry_run() {
     fi
 }
 
+# Test 21: Healthcheck Client Startup Budget
+test_healthcheck_client_startup() {
+    log_section "Test 21: Healthcheck Client Startup Budget"
+    
+    local client="health/healthcheck_client.py"
+    local budget_ms="${HEALTHCHECK_BUDGET_MS:-50}"
+    local port="${HEALTHCHECK_TEST_PORT:-19188}"
+    
+    if [ ! -f "$client" ] || ! command -v python3 &> /dev/null; then
+        log_skip "healthcheck_client.py or python3 not available"
+        return
+    fi
+    
+    # Time the real interpreter, not a version-manager shim in front of it
+    local python
+    python=$(python3 -c 'import sys; print(sys.executable)')
+    
+    # Stand-in for health_checker.py --daemon answering /status
+    "$python" - "$port" <<'PY' &
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"healthy 1.000\n"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+HTTPServer(("127.0.0.1", int(sys.argv[1])), StatusHandler).serve_forever()
+PY
+    local stub_pid=$!
+    for _ in $(seq 1 50); do
+        (echo > "/dev/tcp/127.0.0.1/$port") 2>/dev/null && break
+        sleep 0.1
+    done
+    
+    # Best of 5 runs, as docker-healthcheck.sh invokes it
+    local best=999999 start end elapsed code=0
+    for _ in 1 2 3 4 5; do
+        start=$(date +%s%N)
+        HEALTH_DAEMON_LISTEN="127.0.0.1:$port" HEALTHCHECK_FALLBACK=0 "$python" -I -S "$client" --quiet
+        code=$?
+        end=$(date +%s%N)
+        elapsed=$(( (end - start) / 1000000 ))
+        [ "$elapsed" -lt "$best" ] && best=$elapsed
+    done
+    kill "$stub_pid" 2>/dev/null
+    wait "$stub_pid" 2>/dev/null
+    
+    if [ "$code" -ne 0 ]; then
+        log_fail "Healthcheck client did not report the daemon's status (exit $code)"
+    elif [ "$best" -le "$budget_ms" ]; then
+        log_pass "Healthcheck client answered in ${best} ms (budget ${budget_ms} ms)"
+    else
+        log_fail "Healthcheck client took ${best} ms (budget ${budget_ms} ms)"
+    fi
+}
+
+# Test 22: Failover Probe Engine Failure Classes
+test_dns_engine_failure_classes() {
+    log_section "Test 22: Failover Probe Engine Failure Classes"
+    
+    local engine_dir="stacks/dns/failover-manager"
+    local port="${DNS_ENGINE_TEST_PORT:-19253}"
+    
+    if [ ! -f "$engine_dir/dns_engine.py" ] || ! command -v python3 &> /dev/null; then
+        log_skip "dns_engine.py or python3 not available"
+        return
+    fi
+    
+    # Stub servers on consecutive ports, one per failure class; prints one
+    # "PASS|FAIL <case> <detail>" line per case
+    local output
+    output=$(python3 - "$engine_dir" "$port" <<'PY' 2>&1
+import asyncio
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+sys.path.insert(0, sys.argv[1])
+import dns_engine
+
+BASE_PORT = int(sys.argv[2])
+
+
+def question_end(query):
+    offset = 12
+    while query[offset]:
+        offset += query[offset] + 1
+    return offset + 5
+
+
+def answer(query, mode):
+    """Build the stub's response to a query for one behaviour"""
+    query_id = struct.unpack("!H", query[:2])[0]
+    question = query[12:question_end(query)]
+    rcode = {"servfail": 2, "refused": 5, "nxdomain": 3}.get(mode, 0)
+    truncated = mode == "truncated"
+    ancount = 0 if rcode or truncated or mode == "noanswer" else 1
+    if mode == "wrong_id":
+        query_id ^= 1
+    if mode == "wrong_case":
+        question = question.swapcase()
+    flags = 0x8180 | rcode | (dns_engine.FLAG_TC if truncated else 0)
+    header = struct.pack("!HHHHHH", query_id, flags, 1, ancount, 0, 0)
+    records = b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, 60, 4) + bytes([192, 0, 2, 1]) if ancount else b""
+    return header + question + records
+
+
+class UDPStub(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        mode = self.server.mode
+        if mode == "stray_then_ok":
+            # Mismatched ID, mismatched 0x20 case and a runt packet must all be ignored
+            for stray in ("wrong_id", "wrong_case"):
+                sock.sendto(answer(data, stray), self.client_address)
+            sock.sendto(b"\x00" * 5, self.client_address)
+            mode = "ok"
+        sock.sendto(answer(data, mode), self.client_address)
+
+
+class TCPStub(socketserver.BaseRequestHandler):
+    def handle(self):
+        length = struct.unpack("!H", self.request.recv(2))[0]
+        response = answer(self.request.recv(length), "ok")
+        self.request.sendall(struct.pack("!H", len(response)) + response)
+
+
+# case -> (stub behaviour, expected reason or "timeout", expected transport)
+CASES = {
+    "noerror": ("ok", "success", "udp"),
+    "id_mismatch": ("wrong_id", "timeout", None),
+    "case_mismatch_0x20": ("wrong_case", "timeout", None),
+    "stray_packets_ignored": ("stray_then_ok", "success", "udp"),
+    "servfail": ("servfail", "servfail", "udp"),
+    "refused": ("refused", "refused", "udp"),
+    "nxdomain": ("nxdomain", "nxdomain", "udp"),
+    "noanswer": ("noanswer", "noanswer", "udp"),
+    "truncated_tcp_retry": ("truncated", "success", "tcp"),
+    "icmp_unreachable": (None, "unreachable", "udp"),
+}
+
+socketserver.ThreadingTCPServer.allow_reuse_address = True
+ports = {}
+for i, (case, (mode, _, _)) in enumerate(CASES.items()):
+    ports[case] = BASE_PORT + i
+    if mode is None:
+        continue  # nothing listens: the kernel answers with ICMP port unreachable
+    udp = socketserver.ThreadingUDPServer(("127.0.0.1", ports[case]), UDPStub)
+    udp.mode = mode
+    tcp = socketserver.ThreadingTCPServer(("127.0.0.1", ports[case]), TCPStub)
+    for server in (udp, tcp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+async def run():
+    for case, (_, reason, transport) in CASES.items():
+        probe = dns_engine.ServerProbe("127.0.0.1", ports[case])
+        try:
+            result = await probe.query("Example.COM", 0.5)
+            got = (result.reason, result.transport)
+        except asyncio.TimeoutError:
+            got = ("timeout", None)
+        finally:
+            probe.close()
+        verdict = "PASS" if got == (reason, transport) else "FAIL"
+        print(f"{verdict} {case} reason={got[0]} transport={got[1]}")
+
+asyncio.run(run())
+PY
+    )
+    
+    if [ -z "$output" ] || ! echo "$output" | grep -q '^PASS\|^FAIL'; then
+        log_fail "Probe engine test did not run: ${output:-no output}"
+        return
+    fi
+    local verdict case detail
+    while read -r verdict case detail; do
+        case "$verdict" in
+            PASS) log_pass "Probe engine: $case ($detail)" ;;
+            FAIL) log_fail "Probe engine: $case ($detail)" ;;
+            *) log_fail "Probe engine: $verdict $case $detail" ;;
+        esac
+    done <<< "$output"
+}
+
 # Generate Test Report
 generate_report() {
     log_section "Test Report Summary"
@@ -693,6 +887,8 @@ EOF
     test_restart_policies
     test_integration_readiness
     test_deployment_dry_run
+    test_healthcheck_client_startup
+    test_dns_engine_failure_classes
     
     # Generate final report
     generate_report
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Asyncio DNS probe engine for the DNS Failover Manager
+
+Each server gets one persistent connected UDP socket; queries are matched to
+answers by transaction ID and question, so many probes can share it.
+Spoofing- and confusion-resistant by construction:
+- Random transaction IDs and 0x20 case randomization of the query name
+- Answers must echo the exact ID and question (including letter case);
+  anything else is a stray packet and is ignored
+- EDNS0 OPT record advertising EDNS_BUFSIZE; truncated answers are retried
+  over TCP
+- Only NOERROR with an A/CNAME answer counts as healthy; SERVFAIL, REFUSED,
+  NXDOMAIN and empty answers are reported with their reason
+"""
+
+import asyncio
+import secrets
+import struct
+import time
+
+QTYPE_A = 1
+QTYPE_CNAME = 5
+QTYPE_OPT = 41
+CLASS_IN = 1
+
+FLAG_QR = 0x8000
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+
+RCODE_NAMES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+
+# DNS flag day 2020 default: avoids IP fragmentation on any path
+EDNS_BUFSIZE = 1232
+
+
+class ProbeResult:
+    """Outcome of one probe; `reason` is a short metric-friendly label"""
+
+    def __init__(self, ok, reason, rtt=None, rcode=None, transport='udp'):
+        self.ok = ok
+        self.reason = reason
+        self.rtt = rtt
+        self.rcode = rcode
+        self.transport = transport
+
+    @property
+    def rcode_name(self):
+        return RCODE_NAMES.get(self.rcode, f'RCODE{self.rcode}')
+
+
+def randomize_case(qname):
+    """0x20 encoding: flip the case of each letter at random"""
+    bits = secrets.randbits(len(qname))
+    return ''.join(
+        c.upper() if c.isalpha() and (bits >> i) & 1 else c.lower()
+        for i, c in enumerate(qname)
+    )
+
+
+def encode_question(qname, qtype=QTYPE_A):
+    labels = b''.join(
+        bytes([len(label)]) + label.encode('ascii')
+        for label in qname.rstrip('.').split('.') if label
+    )
+    return labels + b'\x00' + struct.pack('!HH', qtype, CLASS_IN)
+
+
+def build_query(query_id, question, bufsize=EDNS_BUFSIZE):
+    """Recursive query with one question and an EDNS0 OPT record"""
+    header = struct.pack('!HHHHHH', query_id, FLAG_RD, 1, 0, 0, 1)
+    opt = b'\x00' + struct.pack('!HHIH', QTYPE_OPT, bufsize, 0, 0)
+    return header + question + opt
+
+
+def _skip_name(data, offset):
+    """Return the offset just past a (possibly compressed) name"""
+    while True:
+        if offset >= len(data):
+            raise ValueError('name runs past end of packet')
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        if length == 0:
+            return offset + 1
+        offset += length + 1
+
+
+def parse_response(data, query_id, question):
+    """Validate a response against the query it claims to answer
+
+    Returns (flags, rcode, answer_types), or None when the packet does not
+    match the query's ID or question (a stray or spoofed packet).
+    """
+    if len(data) < 12:
+        return None
+    response_id, flags, qdcount, ancount = struct.unpack('!HHHH', data[:8])
+    if response_id != query_id or not flags & FLAG_QR or qdcount != 1:
+        return None
+    # The question must be echoed byte for byte, which also verifies the 0x20 case pattern
+    if data[12:12 + len(question)] != question:
+        return None
+
+    offset = 12 + len(question)
+    answer_types = []
+    try:
+        for _ in range(ancount):
+            offset = _skip_name(data, offset)
+            rtype, _, _, rdlength = struct.unpack('!HHIH', data[offset:offset + 10])
+            answer_types.append(rtype)
+            offset += 10 + rdlength
+    except (ValueError, struct.error):
+        raise ValueError('malformed answer section')
+    return flags, flags & 0x000F, answer_types
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server._datagram_received(data)
+
+    def error_received(self, exc):
+        # ICMP port/host unreachable on the connected socket: fail every outstanding probe now
+        self.server._fail_pending(exc)
+
+    def connection_lost(self, exc):
+        self.server._transport = None
+        self.server._fail_pending(exc or ConnectionError('socket closed'))
+
+
+class ServerProbe:
+    """Probes one DNS server over a persistent connected UDP socket"""
+
+    def __init__(self, ip, port=53, bufsize=EDNS_BUFSIZE):
+        self.ip = ip
+        self.port = port
+        self.bufsize = bufsize
+        self._transport = None
+        self._connecting = None
+        # query ID -> (question bytes, future resolved with the raw response)
+        self._pending = {}
+
+    async def _udp(self):
+        if self._transport is None:
+            if self._connecting is None:
+                loop = asyncio.get_running_loop()
+                self._connecting = loop.create_task(loop.create_datagram_endpoint(
+                    lambda: _UDPProtocol(self), remote_addr=(self.ip, self.port)
+                ))
+            try:
+                self._transport, _ = await self._connecting
+            finally:
+                self._connecting = None
+        return self._transport
+
+    def _datagram_received(self, data):
+        if len(data) < 12:
+            return
+        query_id = struct.unpack('!H', data[:2])[0]
+        entry = self._pending.get(query_id)
+        if entry is None:
+            return
+        question, future = entry
+        try:
+            parsed = parse_response(data, query_id, question)
+        except ValueError as e:
+            parsed = e
+        if parsed is None or future.done():
+            return
+        if isinstance(parsed, ValueError):
+            future.set_exception(parsed)
+        else:
+            future.set_result((data, parsed))
+
+    def _fail_pending(self, exc):
+        for _, future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def _tcp(self, packet, query_id, question, timeout):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.ip, self.port), timeout)
+        try:
+            writer.write(struct.pack('!H', len(packet)) + packet)
+            await writer.drain()
+            length = struct.unpack('!H', await reader.readexactly(2))[0]
+            data = await reader.readexactly(length)
+        finally:
+            writer.close()
+        parsed = parse_response(data, query_id, question)
+        if parsed is None:
+            raise ValueError('TCP answer does not match the query')
+        return parsed
+
+    async def query(self, qname, timeout, qtype=QTYPE_A):
+        """Probe with one query; raises asyncio.TimeoutError when no valid answer arrives in time"""
+        question = encode_question(randomize_case(qname), qtype)
+        query_id = secrets.randbits(16)
+        while query_id in self._pending:
+            query_id = secrets.randbits(16)
+        packet = build_query(query_id, question, self.bufsize)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        started = time.monotonic()
+        deadline = started + timeout
+        transport = 'udp'
+        try:
+            udp = await self._udp()
+            self._pending[query_id] = (question, future)
+            udp.sendto(packet)
+            _, (flags, rcode, answer_types) = await asyncio.wait_for(future, timeout)
+            if flags & FLAG_TC:
+                transport = 'tcp'
+                remaining = max(0.0, deadline - time.monotonic())
+                flags, rcode, answer_types = await asyncio.wait_for(
+                    self._tcp(packet, query_id, question, remaining), remaining
+                )
+        except asyncio.TimeoutError:
+            # A subclass of OSError on Python 3.11+, so it must be re-raised before the next clause
+            raise
+        except OSError:
+            # ICMP unreachable, refused TCP retry, or a reset mid-answer
+            return ProbeResult(False, 'unreachable', transport=transport)
+        except (ValueError, asyncio.IncompleteReadError):
+            return ProbeResult(False, 'malformed', transport=transport)
+        finally:
+            self._pending.pop(query_id, None)
+        rtt = time.monotonic() - started
+
+        if rcode != 0:
+            return ProbeResult(False, RCODE_NAMES.get(rcode, f'rcode{rcode}').lower(), rtt, rcode, transport)
+        if not any(t in (QTYPE_A, QTYPE_CNAME) for t in answer_types):
+            return ProbeResult(False, 'noanswer', rtt, rcode, transport)
+        return ProbeResult(True, 'success', rtt, rcode, transport)
@@ -4,14 +4,19 @@ DNS Failover Manager
 Monitors DNS servers across regions and manages automatic failover
 """
 
-import socket
+import asyncio
+import random
 import time
 import logging
 import os
+import json
+import tempfile
 from datetime import datetime
 from prometheus_client import Counter, Gauge, Histogram, start_http_server
 import subprocess
 
+from dns_engine import EDNS_BUFSIZE as DEFAULT_EDNS_BUFSIZE, ServerProbe
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,10 +30,62 @@ dns_response_time = Histogram('dns_failover_response_seconds', 'DNS query respon
 dns_server_status = Gauge('dns_failover_server_status', 'DNS server status (1=up, 0=down)', ['server'])
 active_server = Gauge('dns_failover_active_server', 'Currently active DNS server', ['server'])
 failover_events = Counter('dns_failover_events_total', 'Total failover events', ['from_server', 'to_server'])
+server_state = Gauge('dns_failover_server_state', 'Damped server state (1=up, 0=down)', ['server'])
+state_transitions = Counter('dns_failover_state_transitions_total', 'Server state transitions', ['server', 'to_state'])
+hold_down_remaining = Gauge('dns_failover_hold_down_seconds', 'Remaining flap hold-down', ['server'])
+fast_probing_status = Gauge('dns_failover_fast_probing', 'Server is being probed at FAST_INTERVAL (1=yes)', ['server'])
+latency_score = Gauge('dns_failover_latency_score_seconds', 'Smoothed RTT scaled up by probe loss', ['server'])
 
 # Configuration
-CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '30'))
-TIMEOUT = 5
+TIMEOUT = float(os.getenv('FAILOVER_TIMEOUT', '5'))
+PROBE_QNAME = os.getenv('FAILOVER_PROBE_QNAME', 'google.com')
+EDNS_BUFSIZE = int(os.getenv('FAILOVER_EDNS_BUFSIZE', str(DEFAULT_EDNS_BUFSIZE)))
+
+# Adaptive per-server timeouts (RFC 6298 style): SRTT + 4*RTTVAR, clamped to
+# [TIMEOUT_FLOOR, TIMEOUT]. Only answers update the estimate, so each
+# consecutive timed-out probe doubles the next timeout (Karn-style, at most
+# 2**MAX_BACKOFF times) and every CEILING_PROBE_EVERY-th one waits the full
+# TIMEOUT: a server that became much slower but still answers is relearned
+# instead of being marked down for good. The floor stays in the hundreds of
+# ms because upstreams answer the probe name by recursion on a cache miss
+TIMEOUT_FLOOR = float(os.getenv('FAILOVER_TIMEOUT_FLOOR', '0.3'))
+MAX_BACKOFF = 3
+CEILING_PROBE_EVERY = 4
+RTT_STATE_FILE = os.getenv('FAILOVER_STATE_FILE', '/var/lib/dns-failover/rtt.json')
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+rtt_state = {}  # server name -> {'srtt', 'rttvar', 'timeouts'}
+
+# Flap damping: a server goes down after FAIL_THRESHOLD consecutive failed
+# probes and back up after RISE_THRESHOLD good ones. Every further down
+# transition within FLAP_WINDOW doubles a hold-down (HOLD_DOWN up to
+# HOLD_DOWN_MAX) during which it stays down, and failback to a recovered
+# higher-priority server waits until it has been up for FAILBACK_DWELL.
+FAIL_THRESHOLD = int(os.getenv('FAILOVER_FAIL_THRESHOLD', '3'))
+RISE_THRESHOLD = int(os.getenv('FAILOVER_RISE_THRESHOLD', '2'))
+FLAP_WINDOW = float(os.getenv('FAILOVER_FLAP_WINDOW', '900'))
+HOLD_DOWN = float(os.getenv('FAILOVER_HOLD_DOWN', '60'))
+HOLD_DOWN_MAX = float(os.getenv('FAILOVER_HOLD_DOWN_MAX', '900'))
+FAILBACK_DWELL = float(os.getenv('FAILOVER_FAILBACK_DWELL', '120'))
+
+# Adaptive probe scheduling: every server has its own probe loop. The active
+# server is probed every ACTIVE_INTERVAL and standbys every STANDBY_INTERVAL.
+# A lost answer from the active server, or one slower than SLOW_FACTOR x its
+# SRTT, switches it to probing every FAST_INTERVAL until CONFIDENCE_PROBES good
+# answers in a row, so FAIL_THRESHOLD losses are confirmed within about a
+# second of the first. All delays are jittered by +-PROBE_JITTER so probes of
+# different servers never synchronise. The defaults send about as many probes
+# as the old fixed 30s cycle over six servers (0.2/s).
+ACTIVE_INTERVAL = float(os.getenv('FAILOVER_ACTIVE_INTERVAL', '5'))
+STANDBY_INTERVAL = float(os.getenv('FAILOVER_STANDBY_INTERVAL', '120'))
+FAST_INTERVAL = float(os.getenv('FAILOVER_FAST_INTERVAL', '0.2'))
+CONFIDENCE_PROBES = int(os.getenv('FAILOVER_CONFIDENCE_PROBES', '5'))
+SLOW_FACTOR = float(os.getenv('FAILOVER_SLOW_FACTOR', '3'))
+PROBE_JITTER = 0.2
+STATE_SAVE_INTERVAL = 60
+# A standby is only switched to on a successful probe at most this old;
+# older ones are re-probed first (all at once when failing over)
+FRESH_AGE = 3 * ACTIVE_INTERVAL
 
 DNS_SERVERS = {
     'primary': os.getenv('PRIMARY_DNS', '192.168.8.251'),
@@ -42,59 +99,403 @@ DNS_SERVERS = {
 PRIORITY_ORDER = ['primary', 'secondary', 'backup1', 'backup2', 'cloud1', 'cloud2']
 current_active = 'primary'
 
-def check_dns_server(server_name, server_addr):
-    """Check if DNS server is responding"""
-    try:
-        start_time = time.time()
-        
-        # Parse address (handle IP:port format)
-        if ':' in server_addr:
-            ip, port = server_addr.split(':')
-            port = int(port)
+# Selection policy: "priority" uses the highest-priority server that is up.
+# "latency" stays within the highest-priority tier that has a server up, but
+# picks the one with the lowest score: SRTT x (1 + LOSS_WEIGHT x smoothed probe
+# loss rate), so one lost probe adds 25% rather than a fixed penalty that would
+# dwarf LAN RTT differences. It only moves off a healthy active server when the
+# score improves by more than LATENCY_MARGIN (relative) and LATENCY_MIN_GAIN
+# seconds for LATENCY_DWELL in a row, and the faster server has been up for
+# FAILBACK_DWELL.
+SELECTION_POLICY = os.getenv('FAILOVER_SELECTION_POLICY', 'priority')
+if SELECTION_POLICY not in ('priority', 'latency'):
+    raise ValueError(f"FAILOVER_SELECTION_POLICY must be 'priority' or 'latency', not {SELECTION_POLICY!r}")
+PRIORITY_TIERS = [
+    tier.split(',')
+    for tier in os.getenv('FAILOVER_PRIORITY_TIERS', 'primary,secondary;backup1,backup2;cloud1,cloud2').split(';')
+]
+SERVER_TIERS = {name: index for index, tier in enumerate(PRIORITY_TIERS) for name in tier}
+LATENCY_MARGIN = float(os.getenv('FAILOVER_LATENCY_MARGIN', '0.3'))
+LATENCY_MIN_GAIN = float(os.getenv('FAILOVER_LATENCY_MIN_GAIN', '0.01'))
+LATENCY_DWELL = float(os.getenv('FAILOVER_LATENCY_DWELL', '60'))
+LOSS_WEIGHT = float(os.getenv('FAILOVER_LOSS_WEIGHT', '2'))
+LOSS_ALPHA = 1 / 8
+
+probes = {}  # server name -> ServerProbe
+server_health = {}  # server name -> ServerHealth
+fast_probing = {}  # server name -> consecutive good answers since fast probing started
+wakeups = {}  # server name -> asyncio.Event that cuts its probe loop's sleep short
+probes_in_flight = set()  # server names with a probe currently running
+last_notice = None  # last selection message, so steady states are logged once
+latency_challenger = None  # (server name, monotonic time it started beating the active one by the margin)
+
+class ServerHealth:
+    """Damped up/down state machine for one server"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = 'unknown'
+        self.since = time.monotonic()
+        self.failures = 0
+        self.successes = 0
+        self.downs = []  # monotonic times of recent up -> down transitions
+        self.hold_until = 0.0
+        self.loss = 0.0  # EWMA of failed probes, 0..1
+        self.last_probe = None  # monotonic time of the latest probe
+        self.last_ok = False
+
+    @property
+    def up(self):
+        return self.state == 'up'
+
+    def fresh(self, now=None):
+        """True when the latest probe is recent enough to switch to this server on"""
+        now = time.monotonic() if now is None else now
+        return self.last_probe is not None and now - self.last_probe <= FRESH_AGE
+
+    def up_for(self, now=None):
+        """Seconds the server has been continuously up (0 when it is not)"""
+        return (time.monotonic() if now is None else now) - self.since if self.up else 0.0
+
+    def observe(self, ok, now=None):
+        """Fold one probe result into the state; returns the new state"""
+        now = time.monotonic() if now is None else now
+        self.loss += LOSS_ALPHA * ((0.0 if ok else 1.0) - self.loss)
+        self.last_probe, self.last_ok = now, ok
+        if ok:
+            self.successes, self.failures = self.successes + 1, 0
         else:
-            ip = server_addr
-            port = 53
-        
-        # Create DNS query for google.com
-        query = b'\x00\x00\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00\x06google\x03com\x00\x00\x01\x00\x01'
-        
-        # Send query
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.settimeout(TIMEOUT)
-        sock.sendto(query, (ip, port))
-        
-        # Receive response
-        data, _ = sock.recvfrom(512)
-        sock.close()
-        
-        response_time = time.time() - start_time
+            self.failures, self.successes = self.failures + 1, 0
+
+        if self.state == 'unknown':
+            # Undecided until a threshold is met, so one lost probe at startup
+            # cannot fail over; next_probe_delay probes it fast meanwhile
+            if self.failures >= FAIL_THRESHOLD:
+                self._transition('down', now, f"{self.failures} consecutive failures")
+            elif self.successes >= RISE_THRESHOLD:
+                self._transition('up', now, f"{self.successes} consecutive successes")
+        elif self.state == 'up' and self.failures >= FAIL_THRESHOLD:
+            self.downs = [t for t in self.downs if now - t < FLAP_WINDOW] + [now]
+            reason = f"{self.failures} consecutive failures"
+            if len(self.downs) > 1:
+                hold = min(HOLD_DOWN_MAX, HOLD_DOWN * 2 ** (len(self.downs) - 2))
+                self.hold_until = now + hold
+                reason += f", flap {len(self.downs)} within {FLAP_WINDOW:.0f}s: held down for {hold:.0f}s"
+            self._transition('down', now, reason)
+        elif self.state == 'down' and self.successes >= RISE_THRESHOLD:
+            if now >= self.hold_until:
+                self._transition('up', now, f"{self.successes} consecutive successes")
+            elif self.successes == RISE_THRESHOLD:
+                logger.info(f"DNS server {self.name} is answering again but held down for another "
+                            f"{self.hold_until - now:.0f}s")
+
+        hold_down_remaining.labels(server=self.name).set(max(0.0, self.hold_until - now))
+        return self.state
+
+    def _transition(self, state, now, reason):
+        log = logger.info if state == 'up' else logger.warning
+        log(f"DNS server {self.name} state {self.state} -> {state} ({reason})")
+        self.state = state
+        self.since = now
+        server_state.labels(server=self.name).set(1 if state == 'up' else 0)
+        state_transitions.labels(server=self.name, to_state=state).inc()
+
+def get_health(server_name):
+    health = server_health.get(server_name)
+    if health is None:
+        health = server_health[server_name] = ServerHealth(server_name)
+    return health
+
+def probe_timeout(server_name):
+    """Timeout for the next probe of a server; TIMEOUT until it has answered once"""
+    state = rtt_state.get(server_name)
+    if not state or state.get('srtt') is None:
+        return TIMEOUT
+    timeouts = state.get('timeouts', 0)
+    if timeouts and timeouts % CEILING_PROBE_EVERY == 0:
+        return TIMEOUT
+    base = max(TIMEOUT_FLOOR, state['srtt'] + 4 * state['rttvar'])
+    return min(TIMEOUT, base * 2 ** min(timeouts, MAX_BACKOFF))
+
+def record_timeout(server_name):
+    """Count a probe that got no answer; backs off the server's next timeout"""
+    state = rtt_state.setdefault(server_name, {'srtt': None, 'rttvar': None})
+    state['timeouts'] = state.get('timeouts', 0) + 1
+
+def record_rtt(server_name, sample):
+    """Fold a successful response time into the server's SRTT/RTTVAR"""
+    state = rtt_state.setdefault(server_name, {'srtt': None, 'rttvar': None})
+    state['timeouts'] = 0
+    if state['srtt'] is None:
+        state['srtt'], state['rttvar'] = sample, sample / 2
+    else:
+        state['rttvar'] = (1 - RTT_BETA) * state['rttvar'] + RTT_BETA * abs(state['srtt'] - sample)
+        state['srtt'] = (1 - RTT_ALPHA) * state['srtt'] + RTT_ALPHA * sample
+
+def load_rtt_state():
+    """Restore per-server RTT estimates saved by a previous run"""
+    try:
+        with open(RTT_STATE_FILE) as f:
+            for name, state in json.load(f).items():
+                rtt_state[name] = {'srtt': state.get('srtt'), 'rttvar': state.get('rttvar'),
+                                   'timeouts': int(state.get('timeouts', 0))}
+        logger.info(f"Loaded RTT estimates for {len(rtt_state)} servers from {RTT_STATE_FILE}")
+    except (OSError, ValueError):
+        pass
+
+def save_rtt_state():
+    """Atomically persist per-server RTT estimates"""
+    try:
+        directory = os.path.dirname(RTT_STATE_FILE) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.rtt-')
+        snapshot = {name: dict(state) for name, state in list(rtt_state.items())}
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, RTT_STATE_FILE)
+    except OSError as e:
+        logger.warning(f"Cannot persist RTT state to {RTT_STATE_FILE}: {e}")
+
+def parse_server_addr(server_addr):
+    """Split "ip[:port]" into (ip, port)"""
+    if ':' in server_addr:
+        ip, port = server_addr.split(':')
+        return ip, int(port)
+    return server_addr, 53
+
+def get_probe(server_name):
+    """Persistent probe (one connected UDP socket) per server"""
+    probe = probes.get(server_name)
+    if probe is None:
+        ip, port = parse_server_addr(DNS_SERVERS[server_name])
+        probe = probes[server_name] = ServerProbe(ip, port, EDNS_BUFSIZE)
+    return probe
+
+async def check_dns_server(server_name, server_addr, single_attempt=False):
+    """Check if DNS server is answering correctly; returns (ok, slow)
+    
+    The first attempt uses the server's adaptive timeout; on timeout one
+    retry is made with double that, so a dead server is detected in a small
+    multiple of its normal response time instead of a fixed 5s. A probe that
+    gets no answer backs off the next one's timeout (see probe_timeout). Probes of
+    the active server make a single attempt: a lost answer switches it to
+    fast probing, which retries sooner. A server that
+    answers with SERVFAIL, REFUSED, NXDOMAIN or no records is down too.
+    """
+    state = rtt_state.get(server_name) or {}
+    # Never below half the timeout floor, so a few ms of LAN jitter is not "slow"
+    slow_after = max(SLOW_FACTOR * state['srtt'], TIMEOUT_FLOOR / 2) if state.get('srtt') else None
+    try:
+        probe = get_probe(server_name)
+        timeout = probe_timeout(server_name)
+        try:
+            result = await probe.query(PROBE_QNAME, timeout)
+        except asyncio.TimeoutError:
+            if single_attempt or timeout >= TIMEOUT:
+                raise
+            retry_timeout = min(TIMEOUT, timeout * 2)
+            logger.info(f"DNS server {server_name} ({server_addr}) no answer within {timeout:.3f}s, "
+                        f"retrying with {retry_timeout:.3f}s")
+            result = await probe.query(PROBE_QNAME, retry_timeout)
         
-        # Record metrics
-        dns_response_time.labels(server=server_name).observe(response_time)
-        dns_checks.labels(server=server_name, status='success').inc()
-        dns_server_status.labels(server=server_name).set(1)
+        # Any valid answer, even SERVFAIL, shows how fast the server responds
+        if result.rtt is not None:
+            record_rtt(server_name, result.rtt)
+            dns_response_time.labels(server=server_name).observe(result.rtt)
+        dns_checks.labels(server=server_name, status=result.reason).inc()
+        dns_server_status.labels(server=server_name).set(1 if result.ok else 0)
         
-        logger.info(f"DNS server {server_name} ({server_addr}) responded in {response_time:.3f}s")
-        return True
+        if not result.ok:
+            logger.warning(f"DNS server {server_name} ({server_addr}) failed probe: {result.reason}"
+                           f" over {result.transport}")
+            return False, False
+        slow = slow_after is not None and result.rtt > slow_after
+        logger.debug(f"DNS server {server_name} ({server_addr}) responded in {result.rtt:.3f}s"
+                     f"{' over tcp' if result.transport == 'tcp' else ''}")
+        return True, slow
         
-    except socket.timeout:
+    except asyncio.TimeoutError:
+        record_timeout(server_name)
         logger.warning(f"DNS server {server_name} ({server_addr}) timed out")
         dns_checks.labels(server=server_name, status='timeout').inc()
         dns_server_status.labels(server=server_name).set(0)
-        return False
+        return False, False
     except Exception as e:
         logger.error(f"DNS server {server_name} ({server_addr}) error: {e}")
         dns_checks.labels(server=server_name, status='error').inc()
         dns_server_status.labels(server=server_name).set(0)
-        return False
+        return False, False
+
+async def probe_server(server_name):
+    """Probe a server and fold the result into its damped state; returns (ok, slow)"""
+    ok, slow = await check_dns_server(server_name, DNS_SERVERS[server_name],
+                                      single_attempt=server_name == current_active)
+    get_health(server_name).observe(ok)
+    return ok, slow
+
+def next_probe_delay(server_name, ok, slow):
+    """Update a server's fast-probing mode after a probe and return the delay until its next one"""
+    if get_health(server_name).state == 'unknown':
+        # Selection waits for undecided servers, so settle their state quickly
+        base = FAST_INTERVAL
+    elif server_name != current_active:
+        fast_probing.pop(server_name, None)
+        base = STANDBY_INTERVAL
+    else:
+        if not ok or slow:
+            if server_name not in fast_probing:
+                logger.info(f"Active DNS server {server_name} {'lost' if not ok else 'slow'} probe, "
+                            f"probing every {FAST_INTERVAL}s")
+            fast_probing[server_name] = 0
+        elif server_name in fast_probing:
+            fast_probing[server_name] += 1
+            if fast_probing[server_name] >= CONFIDENCE_PROBES:
+                del fast_probing[server_name]
+                logger.info(f"Active DNS server {server_name} answered {CONFIDENCE_PROBES} probes in a row, "
+                            f"back to probing every {ACTIVE_INTERVAL}s")
+        base = FAST_INTERVAL if server_name in fast_probing else ACTIVE_INTERVAL
+    fast_probing_status.labels(server=server_name).set(1 if server_name in fast_probing else 0)
+    return base * random.uniform(1 - PROBE_JITTER, 1 + PROBE_JITTER)
+
+def notice(log, message):
+    """Log a selection message unless it repeats the previous one"""
+    global last_notice
+    if message != last_notice:
+        log(message)
+        last_notice = message
 
-def get_best_available_server():
-    """Find the highest priority available DNS server"""
+def server_score(server_name):
+    """SRTT scaled up by the smoothed loss rate, or None before the first answer"""
+    srtt = (rtt_state.get(server_name) or {}).get('srtt')
+    if srtt is None:
+        return None
+    score = srtt * (1 + LOSS_WEIGHT * get_health(server_name).loss)
+    latency_score.labels(server=server_name).set(score)
+    return score
+
+def fastest_in_tier(top_server):
+    """Lowest-scoring server that is up in top_server's tier
+    
+    The active one is kept unless another has beaten it by the margin for
+    LATENCY_DWELL in a row.
+    """
+    global latency_challenger
+    tier = SERVER_TIERS.get(top_server)
+    scores = {}
     for server_name in PRIORITY_ORDER:
-        server_addr = DNS_SERVERS.get(server_name)
-        if server_addr and check_dns_server(server_name, server_addr):
-            return server_name
-    return None
+        health = get_health(server_name)
+        if (DNS_SERVERS.get(server_name) and SERVER_TIERS.get(server_name) == tier and health.up
+                and (server_name == current_active or health.last_ok)):
+            score = server_score(server_name)
+            if score is not None:
+                scores[server_name] = score
+    if tier is None or not scores:
+        return top_server
+    fastest = min(scores, key=scores.get)
+    current = scores.get(current_active)
+    if current is not None:
+        if current - scores[fastest] <= max(LATENCY_MARGIN * current, LATENCY_MIN_GAIN):
+            latency_challenger = None
+            return current_active
+        now = time.monotonic()
+        if latency_challenger is None or latency_challenger[0] != fastest:
+            latency_challenger = (fastest, now)
+        if now - latency_challenger[1] < LATENCY_DWELL:
+            notice(logger.info, f"Faster server {fastest} beats {current_active}, switching if that holds "
+                                f"for {LATENCY_DWELL:.0f}s")
+            return current_active
+    latency_challenger = None
+    return fastest
+
+def request_probe(server_name):
+    """Probe a server now instead of at the end of its sleep, unless a probe is already running"""
+    if server_name not in probes_in_flight and server_name in wakeups:
+        wakeups[server_name].set()
+
+def select_active():
+    """Fail over, fail back or move to a faster server according to the damped server states
+    
+    Decides nothing while a higher-priority server has not been probed yet.
+    A server other than the active one is only chosen when its latest probe
+    succeeded within FRESH_AGE: a standby's state can be STANDBY_INTERVAL old,
+    so stale candidates are re-probed first. When the active server is down
+    every stale standby is re-probed at once, so the switch costs one probe
+    timeout and never goes to a standby that died in the meantime.
+    """
+    now = time.monotonic()
+    failing_over = not get_health(current_active).up
+    best_server = None
+    for server_name in PRIORITY_ORDER:
+        if not DNS_SERVERS.get(server_name):
+            continue
+        health = get_health(server_name)
+        if health.state == 'unknown':
+            return
+        if health.state != 'up':
+            continue
+        if server_name == current_active or (health.fresh(now) and health.last_ok):
+            best_server = server_name
+            break
+        if health.fresh(now):
+            continue  # Up, but its latest probe failed
+        if failing_over:
+            for name in PRIORITY_ORDER:
+                if DNS_SERVERS.get(name) and name != current_active and not get_health(name).fresh(now):
+                    request_probe(name)
+        else:
+            request_probe(server_name)
+        return
+    
+    if best_server is None:
+        notice(logger.error, "No DNS servers available!")
+        return
+    if SELECTION_POLICY == 'latency':
+        best_server = fastest_in_tier(best_server)
+        if best_server != current_active and not get_health(best_server).fresh(now):
+            request_probe(best_server)
+            return
+    if best_server == current_active:
+        if latency_challenger is None:
+            notice(logger.info, f"Active DNS server {current_active} is healthy")
+        return
+    if not get_health(current_active).up:
+        logger.warning(f"Active DNS server {current_active} is down!")
+    else:
+        higher_priority = PRIORITY_ORDER.index(best_server) < PRIORITY_ORDER.index(current_active)
+        reason = "Higher priority server" if higher_priority else "Faster server"
+        if get_health(best_server).up_for() < FAILBACK_DWELL:
+            notice(logger.info, f"{reason} {best_server} is up, switching once it has "
+                                f"been up for {FAILBACK_DWELL:.0f}s")
+            return
+        if higher_priority:
+            logger.info(f"Higher priority server {best_server} is now available, failing back...")
+        else:
+            logger.info(f"Faster server {best_server} ({server_score(best_server) * 1000:.1f}ms) beats "
+                        f"{current_active} ({server_score(current_active) * 1000:.1f}ms), switching...")
+    update_system_dns(best_server)
+    # Probe the new active server now instead of at the end of its standby sleep
+    request_probe(best_server)
+
+async def probe_loop(server_name):
+    """Probe one server forever on its adaptive schedule"""
+    wakeup = wakeups.setdefault(server_name, asyncio.Event())
+    while True:
+        try:
+            probes_in_flight.add(server_name)
+            try:
+                ok, slow = await probe_server(server_name)
+            finally:
+                probes_in_flight.discard(server_name)
+            select_active()
+            delay = next_probe_delay(server_name, ok, slow)
+        except Exception as e:
+            logger.error(f"Error probing DNS server {server_name}: {e}")
+            delay = ACTIVE_INTERVAL
+        try:
+            await asyncio.wait_for(wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
 
 def update_system_dns(server_name):
     """Update system DNS configuration to use specified server"""
@@ -121,51 +522,26 @@ def update_system_dns(server_name):
     except Exception as e:
         logger.error(f"Failed to update DNS to {server_name}: {e}")
 
-def health_check_loop():
-    """Main health check loop"""
+async def health_check_loop():
+    """Run one probe loop per server and persist RTT estimates periodically"""
     logger.info("DNS Failover Manager started")
     logger.info(f"Monitoring servers: {', '.join(PRIORITY_ORDER)}")
-    logger.info(f"Check interval: {CHECK_INTERVAL}s")
+    logger.info(f"Probe intervals: active {ACTIVE_INTERVAL}s, standby {STANDBY_INTERVAL}s, "
+                f"fast {FAST_INTERVAL}s")
     
     # Initialize active server
     active_server.labels(server=current_active).set(1)
+    load_rtt_state()
     
-    while True:
-        try:
-            logger.info("Running DNS health checks...")
-            
-            # Check current active server
-            if not check_dns_server(current_active, DNS_SERVERS[current_active]):
-                logger.warning(f"Active DNS server {current_active} is down!")
-                
-                # Find best available server
-                best_server = get_best_available_server()
-                if best_server and best_server != current_active:
-                    update_system_dns(best_server)
-                else:
-                    logger.error("No DNS servers available!")
-            else:
-                logger.info(f"Active DNS server {current_active} is healthy")
-                
-                # Check if we can fail back to higher priority server
-                for server_name in PRIORITY_ORDER:
-                    if server_name == current_active:
-                        break  # Current server is highest available
-                    
-                    server_addr = DNS_SERVERS.get(server_name)
-                    if server_addr and check_dns_server(server_name, server_addr):
-                        logger.info(f"Higher priority server {server_name} is now available, failing back...")
-                        update_system_dns(server_name)
-                        break
-            
-            time.sleep(CHECK_INTERVAL)
-            
-        except KeyboardInterrupt:
-            logger.info("Shutting down...")
-            break
-        except Exception as e:
-            logger.error(f"Error in health check loop: {e}")
-            time.sleep(CHECK_INTERVAL)
+    loops = [asyncio.create_task(probe_loop(name)) for name in PRIORITY_ORDER if DNS_SERVERS.get(name)]
+    try:
+        while True:
+            await asyncio.sleep(STATE_SAVE_INTERVAL)
+            save_rtt_state()
+    finally:
+        for task in loops:
+            task.cancel()
+        save_rtt_state()
 
 if __name__ == '__main__':
     # Start Prometheus metrics server
@@ -173,4 +549,7 @@ if __name__ == '__main__':
     logger.info("Prometheus metrics server started on port 8081")
     
     # Start health check loop
-    health_check_loop()
+    try:
+        asyncio.run(health_check_loop())
+    except KeyboardInterrupt:
+        logger.info("Shutting down...")